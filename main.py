@@ -2,7 +2,11 @@ from planar.logging import get_logger
 from planar import PlanarApp
 
 from planar_computer_use.routes import router
-from planar_computer_use.workflows import perform_computer_task, highlight_ui_element
+from planar_computer_use.workflows import (
+    perform_computer_task,
+    highlight_ui_element,
+    highlight_ui_elements,
+)
 
 # Configure logging
 logger = get_logger(__name__)
@@ -16,4 +20,5 @@ app = (
     .register_router(router=router, prefix="")
     .register_workflow(perform_computer_task)
     .register_workflow(highlight_ui_element)
+    .register_workflow(highlight_ui_elements)
 )
@@ -1,48 +1,157 @@
+import asyncio
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+import gc
 import gradio as gr
-from transformers import Qwen2VLForConditionalGeneration, AutoProcessor
-from qwen_vl_utils import process_vision_info
-import base64
-from PIL import ImageDraw
+import torch
+from transformers import (
+    LogitsProcessorList,
+    Qwen2VLForConditionalGeneration,
+    AutoProcessor,
+)
+from qwen_vl_utils import fetch_image
 from io import BytesIO
+import json
+import logging
+import os
+from PIL import Image, ImageDraw, UnidentifiedImageError
 import re
+import time
+from typing import Optional
+import uvicorn
 
+from batching import MicroBatcher
+from bbox_grammar import BboxGrammar, BboxTokens
+from model_registry import ModelRegistry
+from vision_cache import CachedVisionTower, VisionCache, VisionEntry, image_hash
 
-models = {
-    "OS-Copilot/OS-Atlas-Base-7B": Qwen2VLForConditionalGeneration.from_pretrained("OS-Copilot/OS-Atlas-Base-7B", torch_dtype="auto", device_map="auto"),
-}
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger("os_atlas")
 
-processors = {
-    "OS-Copilot/OS-Atlas-Base-7B": AutoProcessor.from_pretrained("OS-Copilot/OS-Atlas-Base-7B")
-}
 
+def default_device():
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+# "cuda", "mps" or "cpu"; picks the best available one by default
+DEVICE = os.getenv("OS_ATLAS_DEVICE") or default_device()
+# Concurrent prompts run together in one generate() call, and how long (in
+# milliseconds) the first one waits for others to join
+MAX_BATCH_SIZE = int(os.getenv("OS_ATLAS_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("OS_ATLAS_MAX_BATCH_WAIT_MS", "10"))
+# Screenshots whose preprocessed pixels and vision tower output are kept, and the
+# memory (in MB, CPU and device together) they may use
+VISION_CACHE_SIZE = int(os.getenv("OS_ATLAS_VISION_CACHE_SIZE", "32"))
+VISION_CACHE_MB = int(os.getenv("OS_ATLAS_VISION_CACHE_MB", "2048"))
+# Only let the model generate well-formed "<|object_ref_start|>...<|box_end|>" answers
+CONSTRAINED_DECODING = (
+    os.getenv("OS_ATLAS_CONSTRAINED_DECODING", "true").lower() == "true"
+)
+# Serve the Gradio demo (and its API) next to the lean /api/ground endpoint
+SERVE_GRADIO = os.getenv("OS_ATLAS_GRADIO", "true").lower() == "true"
+# Largest screenshot (in MB) /api/ground accepts
+MAX_BODY_MB = float(os.getenv("OS_ATLAS_MAX_BODY_MB", "32"))
+# Comma separated models that can be served, the first one is loaded at startup
+# and used by default; the others are loaded on their first request
+MODEL_IDS = os.getenv("OS_ATLAS_MODELS", "OS-Copilot/OS-Atlas-Base-7B").split(",")
+DEFAULT_MODEL_ID = MODEL_IDS[0]
+# Unload models unused for this many seconds (0 keeps them loaded)
+IDLE_UNLOAD_SECONDS = float(os.getenv("OS_ATLAS_IDLE_UNLOAD_SECONDS", "0"))
+
+# Loaded models, filled and emptied by `registry`
+models = {}
+processors = {}
+bbox_tokens = {}
+
+# Questions about a screenshot seen recently skip its preprocessing and vision tower
+vision_cache = VisionCache(VISION_CACHE_SIZE, VISION_CACHE_MB * 1024 * 1024)
 
-def image_to_base64(image):
-    buffered = BytesIO()
-    image.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
+
+def load_model(model_id):
+    model = Qwen2VLForConditionalGeneration.from_pretrained(
+        model_id, torch_dtype="auto", device_map=DEVICE
+    )
+    model.visual = CachedVisionTower(
+        model.visual, vision_cache, model.config.vision_config.spatial_merge_size
+    )
+    processors[model_id] = AutoProcessor.from_pretrained(model_id)
+    bbox_tokens[model_id] = BboxTokens(processors[model_id].tokenizer)
+    models[model_id] = model.eval()
+
+
+def unload_model(model_id):
+    models.pop(model_id, None)
+    processors.pop(model_id, None)
+    bbox_tokens.pop(model_id, None)
+    vision_cache.forget_model(model_id)
+    gc.collect()
+    if DEVICE == "cuda":
+        torch.cuda.empty_cache()
+    elif DEVICE == "mps":
+        torch.mps.empty_cache()
+
+
+def warmup_screenshot():
+    """A synthetic 1280x800 screenshot with a title bar, a sidebar and a few labelled buttons."""
+    image = Image.new("RGB", (1280, 800), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 40), fill=(60, 60, 60))
+    draw.text((16, 12), "Untitled - Editor", fill="white")
+    draw.rectangle((0, 40, 240, 800), fill=(235, 235, 235))
+    for i, label in enumerate(["Open", "Save", "Settings"]):
+        draw.rectangle(
+            (300 + i * 160, 100, 440 + i * 160, 140),
+            outline="black",
+            fill=(200, 220, 255),
+        )
+        draw.text((320 + i * 160, 112), label, fill="black")
+    return image
+
+
+def warmup_model(model_id):
+    # Compiles kernels and grows the allocator before the first real request, batched like those
+    image = warmup_screenshot()
+    generate(
+        model_id,
+        [(image, "Save button"), (image, "Settings button")],
+        record_stats=False,
+    )
+
+
+registry = ModelRegistry(
+    MODEL_IDS, load_model, warmup_model, unload_model, IDLE_UNLOAD_SECONDS
+)
 
 
 def draw_bounding_boxes(image, bounding_boxes, outline_color="red", line_width=2):
     draw = ImageDraw.Draw(image)
     for box in bounding_boxes:
         xmin, ymin, xmax, ymax = box
-        draw.rectangle([xmin, ymin, xmax, ymax], outline=outline_color, width=line_width)
+        draw.rectangle(
+            [xmin, ymin, xmax, ymax], outline=outline_color, width=line_width
+        )
     return image
 
 
-def rescale_bounding_boxes(bounding_boxes, original_width, original_height, scaled_width=1000, scaled_height=1000):
+def rescale_bounding_boxes(
+    bounding_boxes,
+    original_width,
+    original_height,
+    scaled_width=1000,
+    scaled_height=1000,
+):
     x_scale = original_width / scaled_width
     y_scale = original_height / scaled_height
     rescaled_boxes = []
     for box in bounding_boxes:
         xmin, ymin, xmax, ymax = box
-        rescaled_box = [
-            xmin * x_scale,
-            ymin * y_scale,
-            xmax * x_scale,
-            ymax * y_scale
-        ]
+        rescaled_box = [xmin * x_scale, ymin * y_scale, xmax * x_scale, ymax * y_scale]
         rescaled_boxes.append(rescaled_box)
     return rescaled_boxes
 
@@ -51,6 +160,7 @@ def rescale_bounding_boxes(bounding_boxes, original_width, original_height, scal
 object_ref_pattern = r"<\|object_ref_start\|>(.*?)<\|object_ref_end\|>"
 box_pattern = r"<\|box_start\|>(.*?)<\|box_end\|>"
 
+
 def parse_bounding_box_info(text):
     """
     Extracts object reference and bounding box coordinates from a given text.
@@ -63,19 +173,20 @@ def parse_bounding_box_info(text):
     if object_ref_match:
         object_ref = object_ref_match.group(1)
     else:
-        print(f"Warning: Object reference not found in text: {text[:50]}...")
+        logger.warning(f"Object reference not found in text: {text[:50]}...")
         # Depending on requirements, you might want to raise an error or return early
 
-    extracted_boxes = [] # Will hold the final [[x1, y1, x2, y2]] structure
+    extracted_boxes = []  # Will hold the final [[x1, y1, x2, y2]] structure
 
     if box_match:
-        box_content = box_match.group(1).strip() # .strip() to handle leading/trailing spaces
+        # .strip() to handle leading/trailing spaces
+        box_content = box_match.group(1).strip()
 
         # Universal way to find all numbers (integers, possibly negative)
         # This will extract numbers from "(49,579),(142,701)" as ['49', '579', '142', '701']
         # and from "[[0, 399, 219, 562]]" as ['0', '399', '219', '562']
         # It's robust to spaces around commas or brackets.
-        numbers_str = re.findall(r'-?\d+', box_content)
+        numbers_str = re.findall(r"-?\d+", box_content)
 
         if len(numbers_str) == 4:
             try:
@@ -84,61 +195,321 @@ def parse_bounding_box_info(text):
                 # The problem asks for the format [[x1, y1, x2, y2]]
                 extracted_boxes = [coords]
             except ValueError:
-                print(f"Warning: Could not convert all extracted numbers to integers in box_content: '{box_content}'")
-        elif numbers_str: # If some numbers were found, but not 4
-            print(f"Warning: Expected 4 coordinates in box_content, but found {len(numbers_str)}: '{box_content}'")
+                logger.warning(
+                    f"Could not convert all extracted numbers to integers in box_content: '{box_content}'"
+                )
+        elif numbers_str:  # If some numbers were found, but not 4
+            logger.warning(
+                f"Expected 4 coordinates in box_content, but found {len(numbers_str)}: '{box_content}'"
+            )
         # else: # No numbers found, or box_content was empty
-            # print(f"Warning: No numbers found in box_content: '{box_content}'")
+        # print(f"Warning: No numbers found in box_content: '{box_content}'")
     else:
         # Handle cases where <|box_start|>...<|box_end|> is not present
-        print(f"Warning: Box content not found in text: {text[:50]}...")
-        pass # extracted_boxes remains empty
+        logger.warning(f"Box content not found in text: {text[:50]}...")
+        pass  # extracted_boxes remains empty
 
     return object_ref, extracted_boxes
 
 
-def run_example(image, text_input, model_id="OS-Copilot/OS-Atlas-Base-7B"):
-    model = models[model_id].eval()
-    processor = processors[model_id]
-    prompt = f"In this UI screenshot, what is the position of the element corresponding to the command \"{text_input}\" (with bbox)?"
-    messages = [
+# Sizes of the screenshots clients send, to tune their downscaling
+size_stats = {
+    "requests": 0,
+    "pixels": 0,
+    "vision_tokens": 0,
+    "prompt_tokens": 0,
+    "generated_tokens": 0,
+    "seconds": 0.0,
+    "max_width": 0,
+    "max_height": 0,
+    "max_generated_tokens": 0,
+}
+
+
+def record_size_stats(
+    image, image_grid_thw, processor, prompt_tokens, generated_tokens, seconds
+):
+    t, h, w = image_grid_thw.tolist()
+    vision_tokens = t * h * w // processor.image_processor.merge_size**2
+    size_stats["requests"] += 1
+    size_stats["pixels"] += image.width * image.height
+    size_stats["vision_tokens"] += vision_tokens
+    size_stats["prompt_tokens"] += prompt_tokens
+    size_stats["generated_tokens"] += generated_tokens
+    size_stats["seconds"] += seconds
+    size_stats["max_width"] = max(size_stats["max_width"], image.width)
+    size_stats["max_height"] = max(size_stats["max_height"], image.height)
+    size_stats["max_generated_tokens"] = max(
+        size_stats["max_generated_tokens"], generated_tokens
+    )
+    logger.info(
+        f"{image.width}x{image.height} image, {vision_tokens} vision tokens, {prompt_tokens} prompt tokens, {generated_tokens} generated tokens, {seconds:.2f}s"
+    )
+
+
+def get_stats():
+    requests = size_stats["requests"] or 1
+    return json.dumps(
+        {
+            **size_stats,
+            "avg_pixels": size_stats["pixels"] / requests,
+            "avg_vision_tokens": size_stats["vision_tokens"] / requests,
+            "avg_generated_tokens": size_stats["generated_tokens"] / requests,
+            "avg_seconds": size_stats["seconds"] / requests,
+            "device": DEVICE,
+            "batching": batcher.stats(),
+            "vision_cache": vision_cache.stats(),
+            "models": registry.stats(),
+        }
+    )
+
+
+IMAGE_TOKEN = "<|image_pad|>"
+
+
+def build_messages(image, text_input):
+    prompt = f'In this UI screenshot, what is the position of the element corresponding to the command "{text_input}" (with bbox)?'
+    return [
         {
             "role": "user",
             "content": [
-                {"type": "image", "image": f"data:image;base64,{image_to_base64(image)}"},
+                {"type": "image", "image": image},
                 {"type": "text", "text": prompt},
             ],
         }
     ]
 
-    text = processor.apply_chat_template(
-        messages, tokenize=False, add_generation_prompt=True
+
+def prepare_inputs(model_id, prompts):
+    """
+    Builds the model inputs for (image, text_input) `prompts` like the processor
+    would, but reusing the screenshots already preprocessed in `vision_cache`.
+
+    Returns the inputs and the (key, entry) of every prompt's image, for the
+    vision tower.
+    """
+    model = models[model_id]
+    processor = processors[model_id]
+    images = {}
+    for image, _ in prompts:
+        if id(image) in images:
+            continue
+        key = (model_id, image_hash(image))
+        entry = vision_cache.get(key)
+        if entry is None:
+            processed = processor.image_processor(
+                images=[fetch_image({"image": image})], return_tensors="pt"
+            )
+            # The model casts the pixels to its dtype anyway, keeping them so halves their size
+            entry = VisionEntry(
+                processed["pixel_values"].to(model.dtype), processed["image_grid_thw"]
+            )
+            vision_cache.put(key, entry)
+        images[id(image)] = key, entry
+    pending = [images[id(image)] for image, _ in prompts]
+
+    merge_length = processor.image_processor.merge_size**2
+    texts = []
+    for (image, text_input), (_, entry) in zip(prompts, pending):
+        text = processor.apply_chat_template(
+            build_messages(image, text_input),
+            tokenize=False,
+            add_generation_prompt=True,
+        )
+        image_tokens = entry.image_grid_thw.prod().item() // merge_length
+        texts.append(text.replace(IMAGE_TOKEN, IMAGE_TOKEN * image_tokens))
+    inputs = processor.tokenizer(texts, padding=True, return_tensors="pt")
+    inputs["image_grid_thw"] = torch.cat([entry.image_grid_thw for _, entry in pending])
+    # The vision tower reads the pixels from the pending entries, these only make the model call it
+    inputs["pixel_values"] = torch.zeros(
+        0, pending[0][1].pixel_values.shape[-1], dtype=model.dtype
     )
-    image_inputs, video_inputs = process_vision_info(messages)
-    inputs = processor(
-        text=[text],
-        images=image_inputs,
-        videos=video_inputs,
-        padding=True,
-        return_tensors="pt",
+    return inputs, pending
+
+
+def generate(model_id, prompts, record_stats=True):
+    """Runs one padded generation for all (image, text_input) `prompts` and returns the decoded outputs."""
+    model = models[model_id].eval()
+    processor = processors[model_id]
+    started = time.perf_counter()
+    # Batched generation needs the prompts aligned on the right
+    processor.tokenizer.padding_side = "left"
+    inputs, pending = prepare_inputs(model_id, prompts)
+    inputs = inputs.to(model.device)
+
+    prompt_length = inputs.input_ids.shape[1]
+    logits_processor = LogitsProcessorList()
+    if CONSTRAINED_DECODING:
+        logits_processor.append(BboxGrammar(bbox_tokens[model_id], prompt_length))
+    # Stop as soon as the box is complete instead of running to max_new_tokens
+    eos_token_id = model.generation_config.eos_token_id
+    eos_token_ids = [bbox_tokens[model_id].box_end] + (
+        eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
     )
-    inputs = inputs.to("mps")
 
-    generated_ids = model.generate(**inputs, max_new_tokens=128)
-    generated_ids_trimmed = [
-        out_ids[len(in_ids) :] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-    ]
+    model.visual.pending = pending
+    try:
+        generated_ids = model.generate(
+            **inputs,
+            max_new_tokens=128,
+            eos_token_id=eos_token_ids,
+            logits_processor=logits_processor,
+        )
+    finally:
+        model.visual.pending = None
+    generated_ids_trimmed = generated_ids[:, prompt_length:]
     output_text = processor.batch_decode(
-        generated_ids_trimmed, skip_special_tokens=False, clean_up_tokenization_spaces=False
+        generated_ids_trimmed,
+        skip_special_tokens=False,
+        clean_up_tokenization_spaces=False,
     )
-    print(output_text)
-    text = output_text[0]
+    logger.info(f"Generated {output_text}")
+    if not record_stats:
+        return output_text
+    seconds = time.perf_counter() - started
+    pad_token_id = model.generation_config.pad_token_id
+    for (image, _), image_grid_thw, attention_mask, out_ids in zip(
+        prompts, inputs["image_grid_thw"], inputs.attention_mask, generated_ids_trimmed
+    ):
+        generated_tokens = int((out_ids != pad_token_id).sum())
+        record_size_stats(
+            image,
+            image_grid_thw,
+            processor,
+            int(attention_mask.sum()),
+            generated_tokens,
+            seconds,
+        )
+    return output_text
+
+
+def generate_batch(model_id, prompts):
+    # The model must not be unloaded while generating
+    with registry.use(model_id):
+        return generate(model_id, prompts)
+
+
+# Concurrent requests (from Gradio's worker threads) are batched into generate() calls
+batcher = MicroBatcher(generate_batch, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS / 1000)
+
+
+def run_example(image, text_input, model_id=DEFAULT_MODEL_ID):
+    registry.wait(model_id)  # Rather than blocking the batcher while the model loads
+    text = batcher.submit(model_id, [(image, text_input)])[0]
 
     object_ref, boxes = parse_bounding_box_info(text)
 
     scaled_boxes = rescale_bounding_boxes(boxes, image.width, image.height)
     return object_ref, scaled_boxes, draw_bounding_boxes(image, scaled_boxes)
 
+
+def first_box(text, image):
+    """The first box of a model answer in `image` pixels, or None."""
+    _, boxes = parse_bounding_box_info(text)
+    scaled_boxes = rescale_bounding_boxes(boxes, image.width, image.height)
+    return scaled_boxes[0] if scaled_boxes else None
+
+
+def run_batch(image, text_inputs, model_id=DEFAULT_MODEL_ID):
+    """
+    Grounds several elements on one screenshot in a single batched generation.
+
+    `text_inputs` is a JSON list of element descriptions. Returns a JSON list with
+    one [xmin, ymin, xmax, ymax] box (in image pixels) per element, or null where
+    no box was found.
+    """
+    text_inputs = json.loads(text_inputs)
+    registry.wait(model_id)
+    texts = batcher.submit(
+        model_id, [(image, text_input) for text_input in text_inputs]
+    )
+    return json.dumps([first_box(text, image) for text in texts])
+
+
+app = FastAPI()
+
+
+async def read_body(request):
+    """The request body, refused with 413 past MAX_BODY_MB without reading it all."""
+    max_bytes = int(MAX_BODY_MB * 1024**2)
+    too_large = HTTPException(
+        status_code=413, detail=f"The request body is larger than {MAX_BODY_MB:g} MB"
+    )
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
+def decode_image(data):
+    try:
+        return Image.open(BytesIO(data)).convert("RGB")
+    except Image.DecompressionBombError:
+        raise HTTPException(status_code=413, detail="The image has too many pixels")
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="The request body is not an image")
+    except (OSError, ValueError) as e:  # Truncated or corrupt image data
+        raise HTTPException(
+            status_code=400, detail=f"The image could not be decoded: {e}"
+        )
+
+
+@app.get("/health/live")
+async def live():
+    """Liveness: the server answers, whether or not its models are loaded."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def ready(model_id: Optional[str] = None, load: bool = False):
+    """
+    Readiness of `model_id` (the default model): 200 once it is loaded and warmed
+    up, 503 while it is unloaded, loading, warming up or failed to load. With
+    `load`, an unloaded model starts loading.
+    """
+    model_id = model_id or DEFAULT_MODEL_ID
+    if model_id not in MODEL_IDS:
+        raise HTTPException(status_code=404, detail=f"Unknown model {model_id}")
+    status = registry.status(model_id, load=load)
+    body = {"status": status, "model_id": model_id, **registry.stats()}
+    if status != "ready":
+        return JSONResponse(body, status_code=503, headers={"Retry-After": "5"})
+    return body
+
+
+@app.post("/api/ground")
+async def ground(
+    request: Request, element: list[str] = Query(), model_id: str = DEFAULT_MODEL_ID
+):
+    """
+    Lean grounding endpoint: the body is the raw screenshot (PNG, JPEG, WebP...)
+    and every `element` query parameter an element to ground on it.
+
+    Returns {"boxes": [...]} with one [xmin, ymin, xmax, ymax] box (in image
+    pixels) per element, or null where no box was found. No base64, Gradio
+    upload or annotated image on the way.
+    """
+    if model_id not in MODEL_IDS:
+        raise HTTPException(status_code=404, detail=f"Unknown model {model_id}")
+    # Answer right away while the model loads, clients wait on /health/ready
+    status = registry.status(model_id)
+    if status != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"{model_id} is {status}",
+            headers={"Retry-After": "5"},
+        )
+    image = await asyncio.to_thread(decode_image, await read_body(request))
+    texts = await asyncio.to_thread(
+        batcher.submit, model_id, [(image, text_input) for text_input in element]
+    )
+    return {"boxes": [first_box(text, image) for text in texts]}
+
+
 css = """
   #output {
     height: 500px; 
@@ -148,13 +519,16 @@ css = """
 """
 with gr.Blocks(css=css) as demo:
     gr.Markdown(
-    """
+        """
     # Demo for OS-ATLAS: A Foundation Action Model For Generalist GUI Agents
-    """)
+    """
+    )
     with gr.Row():
         with gr.Column():
             input_img = gr.Image(label="Input Image", type="pil")
-            model_selector = gr.Dropdown(choices=list(models.keys()), label="Model", value="OS-Copilot/OS-Atlas-Base-7B")
+            model_selector = gr.Dropdown(
+                choices=MODEL_IDS, label="Model", value=DEFAULT_MODEL_ID
+            )
             text_input = gr.Textbox(label="User Prompt")
             submit_btn = gr.Button(value="Submit")
         with gr.Column():
@@ -174,6 +548,32 @@ with gr.Blocks(css=css) as demo:
     #     label="Try examples"
     # )
 
-    submit_btn.click(run_example, [input_img, text_input, model_selector], [model_output_text, model_output_box, annotated_image])
+    submit_btn.click(
+        run_example,
+        [input_img, text_input, model_selector],
+        [model_output_text, model_output_box, annotated_image],
+    )
+
+    # API-only endpoint for grounding several elements at once
+    batch_text_inputs = gr.Textbox(visible=False)
+    batch_output = gr.Textbox(visible=False)
+    batch_btn = gr.Button(visible=False)
+    batch_btn.click(
+        run_batch,
+        [input_img, batch_text_inputs, model_selector],
+        [batch_output],
+        api_name="run_batch",
+    )
+
+    # API-only endpoint reporting the sizes of received screenshots
+    stats_output = gr.Textbox(visible=False)
+    stats_btn = gr.Button(visible=False)
+    stats_btn.click(get_stats, [], [stats_output], api_name="stats")
 
-demo.launch(debug=True, server_name="0.0.0.0", server_port=7080)
+# Let concurrent requests reach the batcher instead of queueing in Gradio one by one
+demo.queue(default_concurrency_limit=MAX_BATCH_SIZE * 2)
+if SERVE_GRADIO:
+    app = gr.mount_gradio_app(app, demo, path="/")
+# Load the default model in the background, the server answers health checks meanwhile
+registry.status(DEFAULT_MODEL_ID)
+uvicorn.run(app, host="0.0.0.0", port=7080)
@@ -0,0 +1,144 @@
+from collections import deque
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class Request:
+    def __init__(self, key, items):
+        self.key = key
+        self.items = items
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent requests into batches for a single worker thread.
+
+    The first waiting request opens a batch; requests with the same key (the
+    model) arriving within `max_wait` seconds join it until `max_batch_size`
+    items are collected. `run_batch(key, items)` then runs once for all of them
+    and each caller gets the results of its own items back. If a batch of
+    several requests fails, each is rerun alone so one bad request does not
+    fail the others.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait=0.01):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._deferred = deque()  # Requests that did not fit the previous batch
+        self._worker = None
+        self._lock = threading.Lock()
+        self.stats_counters = {
+            "batches": 0,
+            "requests": 0,
+            "items": 0,
+            "max_batch_size_seen": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "failed_batches": 0,
+            "split_requests": 0,  # Requests rerun alone after their batch failed
+        }
+
+    def submit(self, key, items):
+        """Queues `items` to be run with other requests for `key` and blocks for their results."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="micro-batcher", daemon=True
+                )
+                self._worker.start()
+        request = Request(key, items)
+        self._queue.put(request)
+        return request.future.result()
+
+    def _next(self, timeout=None):
+        if self._deferred:
+            return self._deferred.popleft()
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self):
+        first = self._next()
+        batch = [first]
+        size = len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        skipped = []
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._next(timeout)
+            except queue.Empty:
+                break
+            if (
+                request.key != first.key
+                or size + len(request.items) > self.max_batch_size
+            ):
+                skipped.append(request)
+                continue
+            batch.append(request)
+            size += len(request.items)
+        self._deferred.extendleft(reversed(skipped))
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            items = [item for request in batch for item in request.items]
+            counters = self.stats_counters
+            counters["batches"] += 1
+            counters["requests"] += len(batch)
+            counters["items"] += len(items)
+            counters["max_batch_size_seen"] = max(
+                counters["max_batch_size_seen"], len(items)
+            )
+            for request in batch:
+                waited = started - request.enqueued_at
+                counters["queue_wait_seconds"] += waited
+                counters["max_queue_wait_seconds"] = max(
+                    counters["max_queue_wait_seconds"], waited
+                )
+
+            try:
+                results = self.run_batch(batch[0].key, items)
+            except Exception as e:
+                counters["failed_batches"] += 1
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                else:
+                    self._run_alone(batch)
+                continue
+            offset = 0
+            for request in batch:
+                request.future.set_result(results[offset : offset + len(request.items)])
+                offset += len(request.items)
+
+    def _run_alone(self, batch):
+        """Reruns each request of a failed batch by itself so only the bad ones fail."""
+        for request in batch:
+            self.stats_counters["split_requests"] += 1
+            try:
+                results = self.run_batch(request.key, request.items)
+            except Exception as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(results)
+
+    def stats(self):
+        counters = self.stats_counters
+        batches = counters["batches"] or 1
+        requests = counters["requests"] or 1
+        return {
+            **counters,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_seconds": self.max_wait,
+            "queued": self._queue.qsize() + len(self._deferred),
+            "avg_batch_size": counters["items"] / batches,
+            "avg_queue_wait_seconds": counters["queue_wait_seconds"] / requests,
+        }
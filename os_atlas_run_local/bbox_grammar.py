@@ -0,0 +1,103 @@
+import torch
+from transformers import LogitsProcessor
+
+REF_START = "<|object_ref_start|>"
+REF_END = "<|object_ref_end|>"
+BOX_START = "<|box_start|>"
+BOX_END = "<|box_end|>"
+
+# "n" stands for a coordinate, 1 to 3 digits or MAX_COORDINATE
+BOX_PATTERN = "(n,n),(n,n)"
+BOX_CHARS = set("0123456789(),")
+MAX_COORDINATE = "1000"
+
+
+def match_box_prefix(text):
+    """
+    Whether `text` can start a box "(x1,y1),(x2,y2)".
+
+    Returns None if it cannot, True if it is a complete box and False if more
+    characters are needed.
+    """
+    position, number = 0, ""
+    for char in text:
+        if position == len(BOX_PATTERN):
+            return None
+        if BOX_PATTERN[position] == "n":
+            if char in "0123456789":
+                number += char
+                if len(number) > 3 and number != MAX_COORDINATE:
+                    return None
+                continue
+            if not number:
+                return None
+            position, number = position + 1, ""  # A coordinate is never last
+        if char != BOX_PATTERN[position]:
+            return None
+        position += 1
+    return position == len(BOX_PATTERN)
+
+
+class BboxTokens:
+    """The token ids of a tokenizer that the bbox grammar cares about, computed once."""
+
+    def __init__(self, tokenizer):
+        self.ref_start, self.ref_end, self.box_start, self.box_end = (
+            tokenizer.convert_tokens_to_ids([REF_START, REF_END, BOX_START, BOX_END])
+        )
+        tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+        self.box_tokens = {
+            i: token
+            for i, token in enumerate(tokens)
+            if token and set(token) <= BOX_CHARS
+        }
+        special = set(tokenizer.all_special_ids) | set(tokenizer.added_tokens_decoder)
+        self.ref_ids = torch.tensor(
+            [i for i in range(len(tokenizer)) if i not in special] + [self.ref_end]
+        )
+
+
+class BboxGrammar(LogitsProcessor):
+    """
+    Restricts generation to "<|object_ref_start|>...<|object_ref_end|><|box_start|>(x1,y1),(x2,y2)<|box_end|>".
+
+    The reference is free text without special tokens (up to `max_ref_tokens`),
+    the box only takes tokens that keep it a valid prefix of the pattern. Each
+    row's state is read back from the tokens it generated after `prompt_length`.
+    """
+
+    def __init__(self, tokens, prompt_length, max_ref_tokens=64):
+        self.tokens = tokens
+        self.prompt_length = prompt_length
+        self.max_ref_tokens = max_ref_tokens
+
+    def allowed(self, generated):
+        """The token ids allowed after the `generated` ones."""
+        tokens = self.tokens
+        if not generated:
+            return [tokens.ref_start]
+        if tokens.ref_end not in generated:
+            return (
+                [tokens.ref_end]
+                if len(generated) > self.max_ref_tokens
+                else tokens.ref_ids
+            )
+        if generated[-1] == tokens.ref_end:
+            return [tokens.box_start]
+        if tokens.box_end in generated:
+            return [tokens.box_end]  # Finished, generate() pads the row from now on
+        start = generated.index(tokens.box_start) + 1
+        box = "".join(tokens.box_tokens.get(i, "") for i in generated[start:])
+        if match_box_prefix(box):
+            return [tokens.box_end]
+        return [
+            i
+            for i, token in tokens.box_tokens.items()
+            if match_box_prefix(box + token) is not None
+        ]
+
+    def __call__(self, input_ids, scores):
+        mask = torch.full_like(scores, float("-inf"))
+        for row, generated in enumerate(input_ids[:, self.prompt_length :].tolist()):
+            mask[row, self.allowed(generated)] = 0
+        return scores + mask
@@ -0,0 +1,157 @@
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+class ModelState:
+    def __init__(self):
+        self.status = "unloaded"  # unloaded, loading, warming_up, ready or failed
+        self.error = None
+        self.done = threading.Event()  # Set once a load finished, successfully or not
+        self.lifecycle_lock = threading.Lock()  # Serializes loading and unloading
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.loads = 0
+        self.unloads = 0
+
+
+class ModelRegistry:
+    """
+    Loads models in background threads, warms them up and unloads idle ones.
+
+    `load(model_id)` loads a model, `warmup(model_id)` runs a first generation on
+    it and `unload(model_id)` frees it again. A model only counts as ready once
+    warmed up. With `idle_unload` seconds, models not used for that long are
+    unloaded, and loaded again on their next request.
+    """
+
+    def __init__(self, model_ids, load, warmup, unload, idle_unload=0):
+        self.model_ids = list(model_ids)
+        self.default_model_id = self.model_ids[0]
+        self.load = load
+        self.warmup = warmup
+        self.unload = unload
+        self.idle_unload = idle_unload
+        self._states = {model_id: ModelState() for model_id in self.model_ids}
+        self._lock = threading.Lock()
+        if idle_unload > 0:
+            threading.Thread(
+                target=self._unload_idle, name="model-reaper", daemon=True
+            ).start()
+
+    def status(self, model_id, load=True):
+        """The status of `model_id`, starting to load it in the background first if `load`."""
+        state = self._states[model_id]
+        with self._lock:
+            if load and state.status in ("unloaded", "failed"):
+                state.status = "loading"
+                state.error = None
+                state.done.clear()
+                threading.Thread(
+                    target=self._load,
+                    args=(model_id,),
+                    name=f"load {model_id}",
+                    daemon=True,
+                ).start()
+            return state.status
+
+    def wait(self, model_id):
+        """Loads `model_id` if needed and blocks until it is ready, raising ModelNotReady if loading failed."""
+        state = self._states[model_id]
+        while self.status(model_id) != "ready":
+            state.done.wait()
+            if state.status == "failed":
+                raise ModelNotReady(f"Loading {model_id} failed: {state.error}")
+
+    @contextmanager
+    def use(self, model_id):
+        """Waits for `model_id` and keeps it from being unloaded while in the block."""
+        state = self._states[model_id]
+        while True:
+            self.wait(model_id)
+            with self._lock:
+                if state.status == "ready":  # Not unloaded in between
+                    state.in_use += 1
+                    break
+        try:
+            yield
+        finally:
+            with self._lock:
+                state.in_use -= 1
+                state.last_used = time.monotonic()
+
+    def _load(self, model_id):
+        state = self._states[model_id]
+        with state.lifecycle_lock:
+            try:
+                started = time.monotonic()
+                self.load(model_id)
+                state.load_seconds = time.monotonic() - started
+                state.status = "warming_up"
+                started = time.monotonic()
+                self.warmup(model_id)
+                state.warmup_seconds = time.monotonic() - started
+            except Exception as e:
+                logger.exception(f"Loading {model_id} failed")
+                self.unload(model_id)
+                with self._lock:
+                    state.status = "failed"
+                    state.error = repr(e)
+            else:
+                logger.info(
+                    f"{model_id} ready, loaded in {state.load_seconds:.1f}s and warmed up in {state.warmup_seconds:.1f}s"
+                )
+                with self._lock:
+                    state.status = "ready"
+                    state.last_used = time.monotonic()
+                    state.loads += 1
+            state.done.set()
+
+    def _unload_idle(self):
+        while True:
+            time.sleep(min(self.idle_unload / 4, 30))
+            for model_id, state in self._states.items():
+                with self._lock:
+                    idle = time.monotonic() - state.last_used
+                    if (
+                        state.status != "ready"
+                        or state.in_use
+                        or idle < self.idle_unload
+                    ):
+                        continue
+                    state.status = "unloaded"
+                    state.done.clear()
+                logger.info(f"Unloading {model_id}, unused for {idle:.0f}s")
+                with state.lifecycle_lock:
+                    self.unload(model_id)
+                    state.unloads += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "default_model": self.default_model_id,
+                "idle_unload_seconds": self.idle_unload,
+                "models": {
+                    model_id: {
+                        "status": state.status,
+                        "error": state.error,
+                        "in_use": state.in_use,
+                        "idle_seconds": now - state.last_used,
+                        "load_seconds": state.load_seconds,
+                        "warmup_seconds": state.warmup_seconds,
+                        "loads": state.loads,
+                        "unloads": state.unloads,
+                    }
+                    for model_id, state in self._states.items()
+                },
+            }
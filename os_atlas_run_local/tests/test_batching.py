@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class Recorder:
+    """A run_batch that records its batches and holds the first one until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def __call__(self, key, items):
+        self.batches.append((key, items))
+        if len(self.batches) == 1:
+            self.release.wait(5)
+        if "fail" in items:
+            raise ValueError("generation failed")
+        return [f"{key}:{item}" for item in items]
+
+
+def submit_while_busy(batcher, recorder, requests):
+    """Submits `requests` in order while the worker is busy with a first one."""
+    pool = ThreadPoolExecutor(max_workers=len(requests) + 1)
+    futures = [pool.submit(batcher.submit, "a", ["first"])]
+    while not recorder.batches:
+        time.sleep(0.001)
+    for key, items in requests:
+        queued = batcher._queue.qsize()
+        futures.append(pool.submit(batcher.submit, key, items))
+        while batcher._queue.qsize() == queued:
+            time.sleep(0.001)
+    recorder.release.set()
+    return futures
+
+
+def test_queued_requests_share_a_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait=0.05)
+
+    futures = submit_while_busy(batcher, recorder, [("a", ["x"]), ("a", ["y", "z"])])
+
+    assert [future.result(5) for future in futures] == [
+        ["a:first"],
+        ["a:x"],
+        ["a:y", "a:z"],
+    ]
+    assert recorder.batches == [("a", ["first"]), ("a", ["x", "y", "z"])]
+    assert batcher.stats()["max_batch_size_seen"] == 3
+
+
+def test_batches_hold_one_key_and_at_most_max_batch_size_items():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=2, max_wait=0.05)
+
+    futures = submit_while_busy(
+        batcher, recorder, [("a", ["x"]), ("b", ["y"]), ("a", ["z"]), ("a", ["w"])]
+    )
+
+    assert [future.result(5) for future in futures] == [
+        ["a:first"],
+        ["a:x"],
+        ["b:y"],
+        ["a:z"],
+        ["a:w"],
+    ]
+    # Skipped requests are served first, in order, by the following batches.
+    assert recorder.batches == [
+        ("a", ["first"]),
+        ("a", ["x", "z"]),
+        ("b", ["y"]),
+        ("a", ["w"]),
+    ]
+
+
+def test_failed_batch_is_rerun_per_request():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait=0.05)
+
+    futures = submit_while_busy(
+        batcher, recorder, [("a", ["x"]), ("a", ["fail"]), ("a", ["y"])]
+    )
+
+    assert futures[0].result(5) == ["a:first"]
+    assert futures[1].result(5) == ["a:x"]
+    with pytest.raises(ValueError):
+        futures[2].result(5)
+    assert futures[3].result(5) == ["a:y"]
+    assert recorder.batches[1:] == [
+        ("a", ["x", "fail", "y"]),
+        ("a", ["x"]),
+        ("a", ["fail"]),
+        ("a", ["y"]),
+    ]
+    stats = batcher.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["split_requests"] == 3
+
+
+def test_failure_of_a_single_request_is_not_retried():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait=0.05)
+
+    futures = submit_while_busy(batcher, recorder, [("b", ["fail"])])
+
+    assert futures[0].result(5) == ["a:first"]
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert recorder.batches[1:] == [("b", ["fail"])]
+    assert batcher.stats()["failed_batches"] == 1
+    assert batcher.stats()["split_requests"] == 0
@@ -0,0 +1,118 @@
+import pytest
+import torch
+
+from bbox_grammar import (
+    BOX_END,
+    BOX_START,
+    REF_END,
+    REF_START,
+    BboxGrammar,
+    BboxTokens,
+    match_box_prefix,
+)
+
+VOCAB = [REF_START, REF_END, BOX_START, BOX_END, "<|im_end|>"]
+VOCAB += ["(", ")", ",", "),(", *"0123456789", "10", "100", "(1", "Save", " button"]
+
+
+class FakeTokenizer:
+    all_special_ids = [VOCAB.index("<|im_end|>")]
+    added_tokens_decoder = {i: token for i, token in enumerate(VOCAB[:4])}
+
+    def __len__(self):
+        return len(VOCAB)
+
+    def convert_tokens_to_ids(self, tokens):
+        return [VOCAB.index(token) for token in tokens]
+
+    def convert_ids_to_tokens(self, ids):
+        return [VOCAB[i] for i in ids]
+
+
+def ids(*tokens):
+    return [VOCAB.index(token) for token in tokens]
+
+
+def allowed_tokens(grammar, *generated):
+    allowed = grammar.allowed(ids(*generated))
+    return {
+        VOCAB[i] for i in (allowed.tolist() if torch.is_tensor(allowed) else allowed)
+    }
+
+
+@pytest.fixture
+def grammar():
+    return BboxGrammar(BboxTokens(FakeTokenizer()), prompt_length=0, max_ref_tokens=3)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("", False),
+        ("(", False),
+        ("(1", False),
+        ("(12,345", False),
+        ("(12,345),(", False),
+        ("(12,345),(678,9", False),
+        ("(12,345),(678,9)", True),
+        ("(0,0),(1000,1000)", True),
+        ("(1000", False),
+        ("(1001", None),
+        ("(10000", None),
+        ("(0999", None),
+        ("1", None),
+        ("()", None),
+        ("(1,,", None),
+        ("(1;", None),
+        ("(1,2)(", None),
+        ("(1,2),(3,4))", None),
+    ],
+)
+def test_match_box_prefix(text, expected):
+    assert match_box_prefix(text) is expected
+
+
+def test_reference_comes_first(grammar):
+    assert allowed_tokens(grammar) == {REF_START}
+    # Any text without special tokens, or the end of the reference.
+    assert allowed_tokens(grammar, REF_START) == set(VOCAB[5:]) | {REF_END}
+
+
+def test_long_reference_is_closed(grammar):
+    assert allowed_tokens(grammar, REF_START, "Save", " button") != {REF_END}
+    assert allowed_tokens(grammar, REF_START, "Save", " button", "Save") == {REF_END}
+
+
+def test_box_follows_reference(grammar):
+    assert allowed_tokens(grammar, REF_START, "Save", REF_END) == {BOX_START}
+    assert allowed_tokens(grammar, REF_START, "Save", REF_END, BOX_START) == {"(", "(1"}
+
+
+def test_coordinates_stop_at_1000(grammar):
+    prefix = (REF_START, "Save", REF_END, BOX_START)
+
+    assert allowed_tokens(grammar, *prefix, "(", "100") == {"0", ","}
+    assert allowed_tokens(grammar, *prefix, "(", "100", "0") == {","}
+    assert allowed_tokens(grammar, *prefix, "(1", "10") == {","}
+
+
+def test_box_end_follows_a_complete_box(grammar):
+    box = ("(1", ",", "2", "),(", "3", ",", "4", ")")
+    prefix = (REF_START, "Save", REF_END, BOX_START)
+
+    assert allowed_tokens(grammar, *prefix, *box) == {BOX_END}
+    assert allowed_tokens(grammar, *prefix, *box, BOX_END) == {BOX_END}
+
+
+def test_scores_of_disallowed_tokens_are_masked():
+    prompt = ids("Save", " button")
+    grammar = BboxGrammar(BboxTokens(FakeTokenizer()), prompt_length=len(prompt))
+    input_ids = torch.tensor(
+        [prompt + ids(REF_START, "Save"), prompt + ids(REF_START, REF_END)]
+    )
+
+    scores = grammar(input_ids, torch.zeros(2, len(VOCAB)))
+
+    assert scores[0, VOCAB.index(REF_END)] == 0
+    assert scores[0, VOCAB.index(BOX_START)] == float("-inf")
+    assert torch.isfinite(scores[1]).nonzero().flatten().tolist() == ids(BOX_START)
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from model_registry import ModelNotReady, ModelRegistry
+
+
+class FakeModels:
+    """load, warmup and unload callables recording their calls; loading and warming up can be held."""
+
+    def __init__(self):
+        self.calls = []
+        self.loaded = set()
+        self.fail = False
+        self.load_gate = threading.Event()
+        self.warmup_gate = threading.Event()
+        self.load_gate.set()
+        self.warmup_gate.set()
+
+    def load(self, model_id):
+        self.calls.append(("load", model_id))
+        self.load_gate.wait(5)
+        if self.fail:
+            raise RuntimeError("out of memory")
+        self.loaded.add(model_id)
+
+    def warmup(self, model_id):
+        self.calls.append(("warmup", model_id))
+        self.warmup_gate.wait(5)
+
+    def unload(self, model_id):
+        self.calls.append(("unload", model_id))
+        self.loaded.discard(model_id)
+
+    def registry(self, model_ids=("a", "b"), idle_unload=0):
+        return ModelRegistry(
+            model_ids, self.load, self.warmup, self.unload, idle_unload
+        )
+
+
+def eventually(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_models_load_and_warm_up_in_the_background():
+    models = FakeModels()
+    models.load_gate.clear()
+    models.warmup_gate.clear()
+    registry = models.registry()
+
+    # Not ready right away, which /health/ready and /api/ground answer with a 503
+    assert registry.status("a") == "loading"
+    eventually(lambda: models.calls == [("load", "a")])
+    models.load_gate.set()
+    eventually(lambda: registry.status("a") == "warming_up")
+    models.warmup_gate.set()
+    registry.wait("a")
+
+    assert registry.status("a") == "ready"
+    assert models.calls == [("load", "a"), ("warmup", "a")]
+    stats = registry.stats()["models"]
+    assert stats["a"]["loads"] == 1
+    assert stats["a"]["warmup_seconds"] is not None
+    assert stats["b"]["status"] == "unloaded"
+
+
+def test_status_without_load_does_not_start_loading():
+    models = FakeModels()
+    registry = models.registry()
+
+    assert registry.status("a", load=False) == "unloaded"
+    time.sleep(0.01)
+    assert models.calls == []
+
+
+def test_failed_load_is_reported_and_retried():
+    models = FakeModels()
+    models.fail = True
+    registry = models.registry()
+
+    with pytest.raises(ModelNotReady, match="out of memory"):
+        registry.wait("a")
+    assert registry.status("a", load=False) == "failed"
+    assert models.calls == [("load", "a"), ("unload", "a")]
+
+    models.fail = False
+    registry.wait("a")
+    assert registry.status("a") == "ready"
+    assert registry.stats()["models"]["a"]["error"] is None
+
+
+def test_idle_models_are_unloaded_and_loaded_again():
+    models = FakeModels()
+    registry = models.registry(idle_unload=0.05)
+    registry.wait("a")
+
+    eventually(lambda: registry.status("a", load=False) == "unloaded")
+    assert models.loaded == set()
+    assert registry.stats()["models"]["a"]["unloads"] == 1
+
+    with registry.use("a"):
+        assert models.loaded == {"a"}
+    assert registry.stats()["models"]["a"]["loads"] == 2
+
+
+def test_models_in_use_are_not_unloaded():
+    models = FakeModels()
+    registry = models.registry(idle_unload=0.05)
+
+    with registry.use("a"):
+        time.sleep(0.2)
+        assert registry.status("a", load=False) == "ready"
+        assert models.loaded == {"a"}
+        assert registry.stats()["models"]["a"]["in_use"] == 1
+
+    eventually(lambda: registry.status("a", load=False) == "unloaded")
+    assert ("unload", "a") in models.calls
+
+
+def test_use_loads_again_when_unloaded_right_after_waiting():
+    models = FakeModels()
+    registry = models.registry()
+    wait = registry.wait
+    waits = []
+
+    def wait_then_unload(model_id):
+        wait(model_id)
+        waits.append(model_id)
+        if len(waits) == 1:  # What the reaper does between wait() and the pinning
+            state = registry._states[model_id]
+            with registry._lock:
+                state.status = "unloaded"
+                state.done.clear()
+            models.unload(model_id)
+
+    registry.wait = wait_then_unload
+
+    with registry.use("a"):
+        assert registry.status("a", load=False) == "ready"
+        assert models.loaded == {"a"}
+
+    assert waits == ["a", "a"]
+    assert models.calls == [
+        ("load", "a"),
+        ("warmup", "a"),
+        ("unload", "a"),
+        ("load", "a"),
+        ("warmup", "a"),
+    ]
+    assert registry.stats()["models"]["a"]["in_use"] == 0
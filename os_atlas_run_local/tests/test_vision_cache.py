@@ -0,0 +1,132 @@
+import torch
+
+from vision_cache import CachedVisionTower, VisionCache, VisionEntry
+
+PATCH_DIM = 4
+PATCHES_PER_IMAGE = 4  # A 1x2x2 grid
+MERGE_SIZE = 2  # So every image is a single vision token
+
+
+def make_entry(value=0.0):
+    return VisionEntry(
+        torch.full((PATCHES_PER_IMAGE, PATCH_DIM), value),
+        torch.tensor([[1, 2, 2]]),
+    )
+
+
+ENTRY_BYTES = make_entry().nbytes
+
+
+def test_hits_and_misses():
+    cache = VisionCache()
+    entry = make_entry()
+    cache.put(("model", "a"), entry)
+
+    assert cache.get(("model", "a")) is entry
+    assert cache.get(("model", "b")) is None
+    assert cache.get(("other model", "a")) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted_past_max_entries():
+    cache = VisionCache(max_entries=2)
+    cache.put(("model", "a"), make_entry())
+    cache.put(("model", "b"), make_entry())
+    cache.get(("model", "a"))
+    cache.put(("model", "c"), make_entry())
+
+    assert cache.get(("model", "b")) is None
+    assert cache.get(("model", "a")) is not None
+    assert cache.get(("model", "c")) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embeddings_count_against_max_bytes():
+    cache = VisionCache(max_bytes=3 * ENTRY_BYTES)
+    first, second = make_entry(), make_entry()
+    cache.put(("model", "a"), first)
+    cache.put(("model", "b"), second)
+    assert cache.stats()["bytes"] == 2 * ENTRY_BYTES
+
+    # Embeddings twice the size of the patches push the total past max_bytes.
+    embeds = torch.zeros(2 * PATCHES_PER_IMAGE, PATCH_DIM)
+    cache.set_embeds(("model", "b"), second, embeds)
+
+    assert cache.get(("model", "a")) is None
+    assert cache.get(("model", "b")) is second
+    assert cache.stats()["bytes"] == 3 * ENTRY_BYTES
+
+
+def test_embeddings_of_a_replaced_entry_are_dropped():
+    cache = VisionCache()
+    old, new = make_entry(), make_entry()
+    cache.put(("model", "a"), old)
+    cache.put(("model", "a"), new)
+
+    cache.set_embeds(("model", "a"), old, torch.zeros(1, PATCH_DIM))
+
+    assert new.image_embeds is None
+    assert cache.stats()["bytes"] == ENTRY_BYTES
+
+
+def test_forget_model_only_drops_its_entries():
+    cache = VisionCache()
+    cache.put(("model", "a"), make_entry())
+    cache.put(("other model", "a"), make_entry())
+
+    cache.forget_model("model")
+
+    assert cache.get(("model", "a")) is None
+    assert cache.get(("other model", "a")) is not None
+    assert cache.stats()["bytes"] == ENTRY_BYTES
+
+
+class FakeVisualTower(torch.nn.Module):
+    """Averages each image's patches into one token and counts its images."""
+
+    def __init__(self):
+        super().__init__()
+        self.scale = torch.nn.Parameter(torch.ones(()))
+        self.images = 0
+
+    def get_dtype(self):
+        return self.scale.dtype
+
+    def forward(self, pixel_values, grid_thw=None):
+        self.images += len(grid_thw)
+        return pixel_values.view(-1, PATCHES_PER_IMAGE, PATCH_DIM).mean(1) * self.scale
+
+
+def test_tower_encodes_each_distinct_image_once():
+    cache = VisionCache()
+    visual = FakeVisualTower()
+    tower = CachedVisionTower(visual, cache, MERGE_SIZE)
+    a, b = (("model", "a"), make_entry(1.0)), (("model", "b"), make_entry(2.0))
+    for key, entry in (a, b):
+        cache.put(key, entry)
+
+    tower.pending = [a, b, a]
+    embeds = tower(torch.zeros(0, PATCH_DIM), grid_thw=torch.zeros(3, 3))
+
+    assert embeds[:, 0].tolist() == [1.0, 2.0, 1.0]
+    assert visual.images == 2
+    assert tower.pending is None
+
+    tower.pending = [b, a]
+    embeds = tower(torch.zeros(0, PATCH_DIM), grid_thw=torch.zeros(2, 3))
+
+    assert embeds[:, 0].tolist() == [2.0, 1.0]
+    assert visual.images == 2
+    stats = cache.stats()
+    assert (stats["vision_encodes"], stats["vision_reuses"]) == (2, 3)
+
+
+def test_tower_delegates_without_pending_images():
+    visual = FakeVisualTower()
+    tower = CachedVisionTower(visual, VisionCache(), MERGE_SIZE)
+
+    embeds = tower(make_entry(3.0).pixel_values, grid_thw=torch.tensor([[1, 2, 2]]))
+
+    assert embeds[:, 0].tolist() == [3.0]
+    assert tower.get_dtype() == visual.scale.dtype
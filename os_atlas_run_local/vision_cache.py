@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+import torch
+
+
+def image_hash(image):
+    """Content hash of a PIL image, equal for identical screenshots."""
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(f"{image.mode}{image.size}".encode())
+    return digest.hexdigest()
+
+
+def tensor_bytes(tensor):
+    return tensor.numel() * tensor.element_size() if tensor is not None else 0
+
+
+class VisionEntry:
+    def __init__(self, pixel_values, image_grid_thw):
+        self.pixel_values = pixel_values  # Preprocessed patches, on the CPU
+        self.image_grid_thw = image_grid_thw
+        self.image_embeds = None  # Vision tower output, on the model's device
+
+    @property
+    def nbytes(self):
+        return tensor_bytes(self.pixel_values) + tensor_bytes(self.image_embeds)
+
+
+class VisionCache:
+    """
+    LRU cache of preprocessed screenshots and their vision tower outputs.
+
+    Entries are keyed by (model id, image hash), so follow-up questions about
+    the same screenshot skip both the image preprocessing and the vision tower.
+    The least recently used entries are dropped past `max_entries` or `max_bytes`.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=2 * 1024**3):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats_counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "vision_encodes": 0,
+            "vision_reuses": 0,
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats_counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats_counters["hits"] += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+
+    def set_embeds(self, key, entry, image_embeds):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._bytes -= entry.nbytes
+                entry.image_embeds = image_embeds
+                self._bytes += entry.nbytes
+                self._evict()
+
+    def forget_model(self, model_id):
+        """Drops the entries of an unloaded model."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == model_id]:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self.stats_counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.stats_counters["hits"] + self.stats_counters["misses"]
+            return {
+                **self.stats_counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.stats_counters["hits"] / lookups if lookups else 0.0,
+            }
+
+
+class CachedVisionTower(torch.nn.Module):
+    """
+    Wraps a Qwen2-VL vision tower to reuse the embeddings kept in a `VisionCache`.
+
+    Before a generation, `pending` is set to the (key, entry) of every image of the
+    batch, in order, and the pixels passed by the model are ignored. The tower then
+    only runs on images whose embeddings are not cached yet, once per distinct
+    image, and stores their output for later calls.
+    """
+
+    def __init__(self, visual, cache, merge_size):
+        super().__init__()
+        self.visual = visual
+        self.cache = cache
+        self.merge_size = merge_size
+        self.pending = None
+
+    def __getattr__(self, name):
+        # The model also reads attributes of its tower, e.g. get_dtype()
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            return getattr(super().__getattr__("visual"), name)
+
+    def forward(self, pixel_values, grid_thw=None, **kwargs):
+        pending, self.pending = self.pending, None  # Only the prefill step sees images
+        if pending is None:
+            return self.visual(pixel_values, grid_thw=grid_thw, **kwargs)
+
+        distinct = dict(pending)
+        embeds = {
+            key: entry.image_embeds
+            for key, entry in distinct.items()
+            if entry.image_embeds is not None
+        }
+        missing = [key for key in distinct if key not in embeds]
+        self.cache.stats_counters["vision_reuses"] += len(pending) - len(missing)
+        if missing:
+            self.cache.stats_counters["vision_encodes"] += len(missing)
+            parameter = next(self.visual.parameters())
+            output = self.visual(
+                torch.cat([distinct[key].pixel_values for key in missing]).to(
+                    parameter.device, parameter.dtype
+                ),
+                grid_thw=torch.cat(
+                    [distinct[key].image_grid_thw for key in missing]
+                ).to(parameter.device),
+                **kwargs,
+            )
+            tokens = [
+                distinct[key].image_grid_thw.prod().item() // self.merge_size**2
+                for key in missing
+            ]
+            for key, image_embeds in zip(missing, output.split(tokens)):
+                embeds[key] = image_embeds.clone()
+                self.cache.set_embeds(key, distinct[key], embeds[key])
+        return torch.cat([embeds[key] for key, _ in pending])
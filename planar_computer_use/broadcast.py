@@ -0,0 +1,275 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import time
+from typing import AsyncIterator, Literal, NamedTuple, Optional
+
+import numpy as np
+from planar.logging import get_logger
+
+from planar_computer_use.encoding import (
+    STREAM_FORMATS,
+    bytes_to_data_url,
+    image_encoder,
+)
+from planar_computer_use.tiles import KEYFRAME, build_tile_update
+from planar_computer_use.vnc_manager import VNCManager, parse_host_port
+
+logger = get_logger(__name__)
+
+# Messages buffered per subscriber before older ones are dropped.
+SUBSCRIBER_QUEUE_SIZE = 2
+
+Message = bytes | str
+
+
+class StreamVariant(NamedTuple):
+    """
+    What a viewer receives: data URLs (SSE), whole binary frames or tile updates.
+
+    Frames are downscaled to fit `width` x `height` when given; the default is the
+    full-resolution lossless PNG.
+    """
+
+    kind: Literal["data_url", "frame", "tiles"]
+    format: str = "png"
+    quality: int = 75
+    keyframe_interval: float = 10
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class VNCDisconnected(ConnectionError):
+    pass
+
+
+class Subscriber:
+    """
+    Bounded, drop-to-latest mailbox of one viewer.
+
+    A slow viewer loses old frames instead of delaying the producer or growing
+    memory. Tile updates only make sense in sequence, so when one has to be
+    dropped the subscriber is flagged to be resynchronized with a keyframe.
+    """
+
+    def __init__(self, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.needs_keyframe = True
+        self.dropped = 0
+        self._messages: deque[Message] = deque()
+        self._ready = asyncio.Event()
+        self._error: Optional[Exception] = None
+
+    def push(self, message: Message, droppable: bool) -> bool:
+        """Queues `message`, returning False if it could not be queued without a resync."""
+        if len(self._messages) >= self.maxsize:
+            if not droppable:
+                return False
+            self._messages.popleft()
+            self.dropped += 1
+        self._messages.append(message)
+        self._ready.set()
+        return True
+
+    def reset(self, keyframe: Message):
+        self.dropped += len(self._messages)
+        self._messages.clear()
+        self._messages.append(keyframe)
+        self.needs_keyframe = False
+        self._ready.set()
+
+    def close(self, error: Exception):
+        self._error = error
+        self._ready.set()
+
+    async def get(self) -> Message:
+        while not self._messages:
+            if self._error:
+                raise self._error
+            self._ready.clear()
+            await self._ready.wait()
+        return self._messages.popleft()
+
+
+class FrameBroadcaster:
+    """Captures and encodes each frame of one desktop once, for every subscribed viewer."""
+
+    def __init__(self, host_port: str, password: str, variant: StreamVariant):
+        self.host_port = host_port
+        self.password = password
+        self.variant = variant
+        self.subscribers: set[Subscriber] = set()
+        self.published = 0
+        self._task: Optional[asyncio.Task] = None
+        self._manager: Optional[VNCManager] = None
+        self._wakeup = asyncio.Event()
+        self._pixels: Optional[np.ndarray] = None
+        self._keyframe: Optional[Message] = None
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def add(self) -> Subscriber:
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        self._wakeup.set()  # Deliver the current frame right away
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def remove(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task and not self._task.done():
+            self._task.cancel()
+
+    async def _encode(
+        self, previous: Optional[np.ndarray], pixels: np.ndarray
+    ) -> Optional[Message]:
+        """Encodes `pixels` for this variant; tile updates are relative to `previous`."""
+        kind, format, quality, _, width, height = self.variant
+        if kind == "tiles":
+            return await image_encoder.run(
+                build_tile_update, previous, pixels, format, quality, previous is None
+            )
+        # Whole frames come from the manager's per-frame cache, shared with other
+        # broadcasters and consumers asking for the same size and format.
+        assert self._manager
+        _, data = await self._manager.frame_variant(width, height, format, quality)
+        if kind == "frame":
+            return data
+        _, mime_type = STREAM_FORMATS[format]
+        return await image_encoder.run(bytes_to_data_url, data, mime_type)
+
+    async def _current_keyframe(self) -> Message:
+        assert self._pixels is not None
+        if self._keyframe is None:
+            keyframe = await self._encode(None, self._pixels)
+            assert keyframe is not None
+            self._keyframe = keyframe
+        return self._keyframe
+
+    async def _publish(self, previous: Optional[np.ndarray], pixels: np.ndarray):
+        tiles = self.variant.kind == "tiles"
+        self._pixels = pixels
+        self._keyframe = None
+        if previous is None or not tiles:
+            message = await self._current_keyframe()
+        else:
+            message = await self._encode(previous, pixels)
+            if isinstance(message, bytes) and message[0] == KEYFRAME:
+                self._keyframe = message
+        if message is None:
+            return  # Identical pixels, nothing to send
+
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if not subscriber.needs_keyframe and not subscriber.push(
+                message, droppable=not tiles
+            ):
+                subscriber.needs_keyframe = True
+
+    async def _run(self):
+        try:
+            async with VNCManager.connect(self.host_port, self.password) as manager:
+                self._manager = manager
+                logger.info(f"Started frame broadcaster for {self.host_port}.")
+                last_version = 0  # Version 0 means nothing was published yet
+                last_pixels: Optional[np.ndarray] = None
+                last_keyframe_at = 0.0
+                while self.subscribers:
+                    self._wakeup.clear()
+                    if not manager.is_connected:
+                        raise VNCDisconnected(f"VNC not connected to {self.host_port}.")
+
+                    if (
+                        manager.published_frame[1] is not None
+                        and manager.frame_version != last_version
+                    ):
+                        version, pixels = await manager.frame_pixels(
+                            self.variant.width, self.variant.height
+                        )
+                        if (
+                            time.monotonic() - last_keyframe_at
+                            >= self.variant.keyframe_interval
+                        ):
+                            last_pixels = None  # Periodic resync
+                            last_keyframe_at = time.monotonic()
+                        await self._publish(last_pixels, pixels)
+                        last_version, last_pixels = version, pixels
+
+                    if self._pixels is not None:
+                        for subscriber in list(self.subscribers):
+                            if subscriber.needs_keyframe:
+                                subscriber.reset(await self._current_keyframe())
+
+                    await self._wait_for_work(manager, last_version)
+        except asyncio.CancelledError:
+            logger.info(f"Frame broadcaster for {self.host_port} stopped.")
+            raise
+        except Exception as e:
+            logger.error(
+                f"Frame broadcaster for {self.host_port} failed: {e}", exc_info=True
+            )
+            for subscriber in self.subscribers:
+                subscriber.close(e)
+
+    async def _wait_for_work(self, manager: VNCManager, last_version: int):
+        """Sleeps until a new frame is published or a new subscriber needs a keyframe."""
+        frame = asyncio.create_task(manager.wait_for_frame(last_version))
+        wakeup = asyncio.create_task(self._wakeup.wait())
+        try:
+            await asyncio.wait([frame, wakeup], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            wakeup.cancel()
+            frame.cancel()
+        if frame.done() and not frame.cancelled():
+            frame.exception()  # A lost connection is detected at the top of the loop
+
+    def stats(self) -> dict[str, int | str]:
+        return {
+            "variant": "/".join(str(part) for part in self.variant),
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": sum(subscriber.dropped for subscriber in self.subscribers),
+        }
+
+
+class FrameHub:
+    """Registry of broadcasters, one per desktop and stream variant."""
+
+    def __init__(self):
+        self._broadcasters: dict[
+            tuple[str, int, str, StreamVariant], FrameBroadcaster
+        ] = {}
+
+    @asynccontextmanager
+    async def subscribe(
+        self, host_port: str, password: str, variant: StreamVariant
+    ) -> AsyncIterator[Subscriber]:
+        host, port = parse_host_port(host_port)
+        key = (host, port, password, variant)
+        broadcaster = self._broadcasters.get(key)
+        if broadcaster is None or broadcaster.done:
+            broadcaster = FrameBroadcaster(host_port, password, variant)
+            self._broadcasters[key] = broadcaster
+
+        subscriber = broadcaster.add()
+        try:
+            yield subscriber
+        finally:
+            broadcaster.remove(subscriber)
+            if (
+                not broadcaster.subscribers
+                and self._broadcasters.get(key) is broadcaster
+            ):
+                del self._broadcasters[key]
+
+    def stats(self) -> dict[str, list[dict[str, int | str]]]:
+        stats: dict[str, list[dict[str, int | str]]] = {}
+        for (host, port, _, _), broadcaster in self._broadcasters.items():
+            stats.setdefault(f"{host}:{port}", []).append(broadcaster.stats())
+        return stats
+
+
+frame_hub = FrameHub()
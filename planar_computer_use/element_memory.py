@@ -0,0 +1,273 @@
+from collections import OrderedDict
+import os
+from typing import Hashable, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image
+
+from planar_computer_use.encoding import image_encoder
+
+# Elements whose appearance is remembered, least recently used ones are dropped.
+ELEMENT_MEMORY_SIZE = int(os.getenv("ELEMENT_MEMORY_SIZE", "512"))
+# Normalized cross-correlation a remembered element must reach to be trusted;
+# below it grounding falls back to the model. Above 1 disables the memory.
+ELEMENT_MEMORY_THRESHOLD = float(os.getenv("ELEMENT_MEMORY_THRESHOLD", "0.9"))
+# The best match must beat the best one elsewhere on screen by this much, so
+# one of several identical icons is never picked at random.
+ELEMENT_MEMORY_MIN_MARGIN = 0.05
+ELEMENT_MEMORY_SCALES = (1.0, 0.9, 1.1, 0.8, 1.25)
+# Context kept around the element's bbox, which helps telling similar elements apart.
+TEMPLATE_MARGIN = 8
+# Frames are searched downsampled by this factor, then refined at full resolution.
+COARSE_FACTOR = 4
+# Templates with less contrast than this (std of gray levels) match anywhere.
+MIN_TEMPLATE_STD = 8.0
+
+BBox = tuple[int, int, int, int]
+
+
+class Match(NamedTuple):
+    score: float
+    runner_up: float
+    x: int
+    y: int
+    scale: float
+
+
+def to_gray(pixels: np.ndarray) -> np.ndarray:
+    return pixels[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def downsample(gray: np.ndarray, factor: int) -> np.ndarray:
+    """Block-averages `gray` by `factor`, dropping incomplete edge blocks."""
+    height, width = gray.shape[0] // factor, gray.shape[1] // factor
+    blocks = gray[: height * factor, : width * factor]
+    return blocks.reshape(height, factor, width, factor).mean(axis=(1, 3))
+
+
+def _window_sums(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Sum of every `height` x `width` window of `image`, via an integral image."""
+    integral = np.pad(image.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    return (
+        integral[height:, width:]
+        - integral[:-height, width:]
+        - integral[height:, :-width]
+        + integral[:-height, :-width]
+    )
+
+
+def ncc_map(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Normalized cross-correlation of `template` at every position it fits in `image`.
+
+    The correlation is computed with FFTs and the per-window normalization with
+    integral images, so the cost barely depends on the template size.
+    """
+    image = image.astype(np.float64)
+    height, width = template.shape
+    if height > image.shape[0] or width > image.shape[1]:
+        return np.zeros((0, 0))
+    centered = template.astype(np.float64) - template.mean()
+    shape = (image.shape[0] + height - 1, image.shape[1] + width - 1)
+    correlation = np.fft.irfft2(
+        np.fft.rfft2(image, shape) * np.fft.rfft2(centered[::-1, ::-1], shape), shape
+    )[height - 1 : image.shape[0], width - 1 : image.shape[1]]
+
+    sums = _window_sums(image, height, width)
+    variance = _window_sums(image * image, height, width) - sums * sums / centered.size
+    denominator = np.sqrt(np.maximum(variance, 0)) * np.sqrt((centered**2).sum())
+    # Windows with less than one gray level of spread are flat; their ratio is noise.
+    scores = np.divide(
+        correlation,
+        denominator,
+        out=np.zeros_like(correlation),
+        where=variance > centered.size,
+    )
+    return np.clip(scores, -1, 1)
+
+
+def _resize(template: np.ndarray, width: int, height: int) -> np.ndarray:
+    image = Image.fromarray(template).resize((width, height), Image.Resampling.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+
+def _peak_and_runner_up(
+    scores: np.ndarray, radius: int
+) -> tuple[tuple[int, int, float], Optional[tuple[int, int, float]]]:
+    """The (y, x, score) of the best position and of the best one away from it."""
+    y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    others = scores.copy()
+    others[
+        max(0, y - radius) : y + radius + 1, max(0, x - radius) : x + radius + 1
+    ] = -np.inf
+    peak = int(y), int(x), float(scores[y, x])
+    if not np.isfinite(others.max()):
+        return peak, None
+    ry, rx = np.unravel_index(int(np.argmax(others)), others.shape)
+    return peak, (int(ry), int(rx), float(others[ry, rx]))
+
+
+def _refine(
+    gray: np.ndarray, template: np.ndarray, x: int, y: int, factor: int
+) -> Optional[tuple[float, int, int]]:
+    """The best full resolution (score, x, y) of `template` near the coarse peak at `x`, `y`."""
+    height, width = template.shape
+    x1, y1 = max(0, x - 2 * factor), max(0, y - 2 * factor)
+    window = gray[y1 : y + height + 2 * factor, x1 : x + width + 2 * factor]
+    scores = ncc_map(window, template)
+    if not scores.size:
+        return None
+    dy, dx = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    return float(scores[dy, dx]), x1 + int(dx), y1 + int(dy)
+
+
+def match_template(
+    pixels: np.ndarray,
+    template: np.ndarray,
+    scales: tuple[float, ...] = ELEMENT_MEMORY_SCALES,
+    factor: int = COARSE_FACTOR,
+) -> Optional[Match]:
+    """
+    Finds the gray-level `template` in the RGB frame `pixels` at any of `scales`.
+
+    Every scale is searched on a downsampled frame; the best one is then refined
+    at full resolution around its coarse peak, and so is the best position away
+    from it, so that both scores compare.
+    """
+    gray = to_gray(pixels)
+    coarse = downsample(gray, factor)
+    best = None
+    for scale in scales:
+        width = round(template.shape[1] * scale / factor)
+        height = round(template.shape[0] * scale / factor)
+        if width < 3 or height < 3:
+            continue
+        scores = ncc_map(coarse, _resize(template, width, height))
+        if not scores.size:
+            continue
+        peak, runner_up = _peak_and_runner_up(scores, max(width, height) // 2)
+        if best is None or peak[2] > best[0][2]:
+            best = peak, runner_up, scale
+    if best is None:
+        return None
+
+    (y, x, _), runner_up, scale = best
+    resized = _resize(
+        template, round(template.shape[1] * scale), round(template.shape[0] * scale)
+    )
+    refined = _refine(gray, resized, x * factor, y * factor, factor)
+    if refined is None:
+        return None
+    second = None
+    if runner_up is not None:
+        second = _refine(
+            gray, resized, runner_up[1] * factor, runner_up[0] * factor, factor
+        )
+    score, x, y = refined
+    return Match(score, second[0] if second else -1.0, x, y, scale)
+
+
+class _Template(NamedTuple):
+    pixels: np.ndarray  # uint8 gray levels of the bbox plus its margin
+    left: int  # bbox offset inside the template
+    top: int
+    width: int
+    height: int
+
+
+class ElementMemory:
+    """
+    Remembers what grounded elements looked like, to find them again locally.
+
+    After a successful model call the element's crop is kept as a template;
+    later frames are searched with multi-scale normalized cross-correlation on
+    the CPU and only a confident, unambiguous match is returned. Anything else
+    falls back to the model.
+
+    Keys are chosen by the caller and should tell apart everything a template
+    is only valid for, e.g. the desktop and frame size besides the element.
+    """
+
+    def __init__(
+        self,
+        max_elements: int = ELEMENT_MEMORY_SIZE,
+        threshold: float = ELEMENT_MEMORY_THRESHOLD,
+        min_margin: float = ELEMENT_MEMORY_MIN_MARGIN,
+    ):
+        self.max_elements = max_elements
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self._templates: OrderedDict[Hashable, _Template] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.low_confidence = 0
+        self.ambiguous = 0
+        self.forgotten = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold <= 1
+
+    def remember(self, key: Hashable, pixels: np.ndarray, bbox: BBox):
+        """Keeps the crop of `bbox` in the RGB frame `pixels` as the template of `key`."""
+        if not self.enabled:
+            return
+        height, width = pixels.shape[:2]
+        x1, x2 = sorted((max(0, bbox[0]), min(width, bbox[2])))
+        y1, y2 = sorted((max(0, bbox[1]), min(height, bbox[3])))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return
+        cx1, cy1 = max(0, x1 - TEMPLATE_MARGIN), max(0, y1 - TEMPLATE_MARGIN)
+        cx2 = min(width, x2 + TEMPLATE_MARGIN)
+        cy2 = min(height, y2 + TEMPLATE_MARGIN)
+        gray = to_gray(pixels[cy1:cy2, cx1:cx2])
+        if gray.std() < MIN_TEMPLATE_STD:
+            self._templates.pop(key, None)
+            return  # Featureless, it would match any flat area
+        self._templates[key] = _Template(
+            gray.round().astype(np.uint8), x1 - cx1, y1 - cy1, x2 - x1, y2 - y1
+        )
+        self._templates.move_to_end(key)
+        while len(self._templates) > self.max_elements:
+            self._templates.popitem(last=False)
+
+    async def locate(self, key: Hashable, pixels: np.ndarray) -> Optional[BBox]:
+        """The bbox of the element remembered as `key` in `pixels`, if it is found confidently."""
+        template = self._templates.get(key)
+        if template is None:
+            self.misses += 1
+            return None
+        self._templates.move_to_end(key)
+        match = await image_encoder.run(match_template, pixels, template.pixels)
+        if match is None or match.score < self.threshold:
+            self.low_confidence += 1
+            return None
+        if match.runner_up > match.score - self.min_margin:
+            self.ambiguous += 1
+            return None
+        self.hits += 1
+        return (
+            match.x + round(template.left * match.scale),
+            match.y + round(template.top * match.scale),
+            match.x + round((template.left + template.width) * match.scale),
+            match.y + round((template.top + template.height) * match.scale),
+        )
+
+    def forget(self, key: Hashable):
+        """Drops the template of `key`, e.g. once a bbox found with it proved stale."""
+        if self._templates.pop(key, None) is not None:
+            self.forgotten += 1
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "elements": len(self._templates),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "low_confidence": self.low_confidence,
+            "ambiguous": self.ambiguous,
+            "forgotten": self.forgotten,
+        }
+
+
+element_memory = ElementMemory()
@@ -0,0 +1,181 @@
+import asyncio
+import base64
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import functools
+import io
+import os
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+import numpy as np
+from PIL import Image
+from planar.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# "thread" or "process". Pillow releases the GIL while compressing, so threads are
+# usually enough; processes also move the Python-level drawing work off the GIL.
+IMAGE_ENCODER_EXECUTOR = os.getenv("IMAGE_ENCODER_EXECUTOR", "thread")
+IMAGE_ENCODER_WORKERS = int(os.getenv("IMAGE_ENCODER_WORKERS", "4"))
+# Jobs allowed to wait for a free worker before callers are held back.
+IMAGE_ENCODER_MAX_QUEUE = int(os.getenv("IMAGE_ENCODER_MAX_QUEUE", "32"))
+
+
+def encode_image(image: Image.Image, format: str = "PNG", **params: Any) -> bytes:
+    buffered = io.BytesIO()
+    image.save(buffered, format=format, **params)
+    return buffered.getvalue()
+
+
+def bytes_to_data_url(data: bytes, mime_type: str) -> str:
+    img_str = base64.b64encode(data).decode("utf-8")
+    return f"data:{mime_type};base64,{img_str}"
+
+
+def encode_data_url(image: Image.Image, format: str = "PNG", **params: Any) -> str:
+    return bytes_to_data_url(
+        encode_image(image, format, **params), f"image/{format.lower()}"
+    )
+
+
+# Formats the live viewer can request: name -> (PIL format, MIME type)
+STREAM_FORMATS: dict[str, tuple[str, str]] = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+
+
+def encode_stream_frame(image: Image.Image, format: str, quality: int) -> bytes:
+    pil_format, _ = STREAM_FORMATS[format]
+    if pil_format == "PNG":
+        return encode_image(image, pil_format)
+    return encode_image(image, pil_format, quality=quality)
+
+
+def fit_size(
+    size: tuple[int, int], width: Optional[int], height: Optional[int]
+) -> tuple[int, int]:
+    """Largest size within `width` x `height` keeping the aspect ratio of `size`. Never upscales."""
+    src_width, src_height = size
+    scale = min(
+        1.0,
+        width / src_width if width else 1.0,
+        height / src_height if height else 1.0,
+    )
+    return max(1, round(src_width * scale)), max(1, round(src_height * scale))
+
+
+def resize_pixels(pixels: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    image = Image.fromarray(pixels, "RGB")
+    return np.asarray(image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0))
+
+
+def encode_pixels(pixels: np.ndarray, format: str, quality: int) -> bytes:
+    return encode_stream_frame(Image.fromarray(pixels, "RGB"), format, quality)
+
+
+class ImageEncoder:
+    """
+    Runs CPU-heavy image work (encoding, drawing) in a worker pool instead of on the event loop.
+
+    At most `workers + max_queue` jobs are handed to the pool at a time; further
+    callers wait for a slot, so a burst of captures applies backpressure instead
+    of growing an unbounded backlog.
+    """
+
+    def __init__(
+        self,
+        executor: str = IMAGE_ENCODER_EXECUTOR,
+        workers: int = IMAGE_ENCODER_WORKERS,
+        max_queue: int = IMAGE_ENCODER_MAX_QUEUE,
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown image encoder executor: {executor}")
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(workers + max_queue)
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._pending = 0
+        self._waiting = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="image-encoder"
+                )
+            logger.info(
+                f"Started image encoder with {self.workers} {self.executor_kind} workers."
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Runs `fn(*args, **kwargs)` in the pool. With a process pool, everything must be picklable."""
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._submitted += 1
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+            self._pending -= 1
+            self._slots.release()
+
+    async def encode(
+        self, image: Image.Image, format: str = "PNG", **params: Any
+    ) -> bytes:
+        return await self.run(encode_image, image, format, **params)
+
+    async def encode_data_url(
+        self, image: Image.Image, format: str = "PNG", **params: Any
+    ) -> str:
+        return await self.run(encode_data_url, image, format, **params)
+
+    def stats(self) -> dict[str, Any]:
+        finished = self._completed + self._failed
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "pending": self._pending,
+            "waiting_for_slot": self._waiting,
+            "avg_seconds": self._total_seconds / finished if finished else 0.0,
+            "max_seconds": self._max_seconds,
+        }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_encoder = ImageEncoder()
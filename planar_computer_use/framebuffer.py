@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# (x, y, width, height) in framebuffer pixels
+Rect = tuple[int, int, int, int]
+
+
+class Framebuffer:
+    """
+    Persistent RGB copy of the remote screen, updated rectangle by rectangle.
+
+    Every applied FramebufferUpdate bumps `sequence` and records the rectangles
+    it touched, so consumers can ask what changed since a sequence number they
+    saw earlier instead of pulling the whole screen again.
+    """
+
+    def __init__(self, width: int, height: int, history: int = 256):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        self.sequence = 0
+        self._dirty: deque[tuple[int, list[Rect]]] = deque(maxlen=history)
+
+    def apply(self, updates: list[tuple[Rect, np.ndarray]]) -> int:
+        """Writes the RGB pixel blocks of one update and returns the new sequence number."""
+        rects = []
+        for (x, y, width, height), block in updates:
+            self.pixels[y : y + height, x : x + width] = block
+            rects.append((x, y, width, height))
+        self.sequence += 1
+        self._dirty.append((self.sequence, rects))
+        return self.sequence
+
+    def changes_since(self, sequence: int) -> Optional[list[Rect]]:
+        """
+        Returns the rectangles updated after `sequence`.
+
+        None means the history no longer reaches back that far (or the sequence
+        is unknown) and the caller should treat the whole screen as changed.
+        """
+        if sequence > self.sequence:
+            return None
+        if sequence == self.sequence:
+            return []
+        if not self._dirty or self._dirty[0][0] > sequence + 1:
+            return None
+        return [rect for seq, rects in self._dirty if seq > sequence for rect in rects]
+
+    def snapshot(self) -> np.ndarray:
+        return self.pixels.copy()
+
+    def to_image(self) -> Image.Image:
+        return Image.fromarray(self.snapshot(), "RGB")
+
+
+def pixels_changed(
+    previous: np.ndarray, current: np.ndarray, rects: Optional[list[Rect]] = None
+) -> bool:
+    """Vectorized comparison of two frames, restricted to `rects` when given."""
+    if previous.shape != current.shape:
+        return True
+    if rects is None:
+        return not np.array_equal(previous, current)
+    return any(
+        not np.array_equal(
+            previous[y : y + height, x : x + width],
+            current[y : y + height, x : x + width],
+        )
+        for x, y, width, height in rects
+    )
+
+
+def bounding_rect(rects: list[Rect]) -> Optional[Rect]:
+    if not rects:
+        return None
+    x1 = min(x for x, _, _, _ in rects)
+    y1 = min(y for _, y, _, _ in rects)
+    x2 = max(x + w for x, _, w, _ in rects)
+    y2 = max(y + h for _, y, _, h in rects)
+    return x1, y1, x2 - x1, y2 - y1
@@ -1,14 +1,32 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+import hashlib
+import json
 import re
-from gradio_client import Client, handle_file
+import time
+import uuid
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, TypeVar
 
+import httpx
+import numpy as np
 import os
 
-from planar.utils import asyncify
+from PIL import Image
+from planar.logging import get_logger
 
+from planar_computer_use.encoding import (
+    STREAM_FORMATS,
+    encode_stream_frame,
+    fit_size,
+    image_encoder,
+)
+from planar_computer_use.element_memory import element_memory
 from planar_computer_use.models import ScreenshotWithPrompt
-from planar_computer_use.pil_utilities import draw_annotated_grid
+from planar_computer_use.pil_utilities import draw_zoomed_grid
+from planar_computer_use.scheduler import BACKGROUND, PriorityScheduler
 from planar_computer_use.vnc_manager import VNCManager
-from planar_computer_use.utils import image_bytes, upload_screenshot
+from planar_computer_use.utils import upload_screenshot
 
 BBOX_PATTERN = re.compile(r"<\|box_start\|>(.*?)<\|box_end\|>")
 COORDS_PATTERN = re.compile(r"\d+\.\d+|\d+")
@@ -20,68 +38,668 @@ if osatlas_endpoint_override:
 OSATLAS_HUGGINGFACE_SOURCE = "http://192.168.1.221:7080"
 OSATLAS_HUGGINGFACE_MODEL = "OS-Copilot/OS-Atlas-Base-7B"
 OSATLAS_HUGGINGFACE_API = "/run_example"
+# Grounds a JSON list of elements on one image, see os_atlas_run_local/app.py.
+OSATLAS_BATCH_API = "/run_batch"
+# With OSATLAS_LEAN_API, OSATLAS_ENDPOINT_OVERRIDE must be the local server: screenshots
+# are then posted as raw bytes to its OSATLAS_GROUND_API endpoint instead of through Gradio.
+OSATLAS_LEAN_API = os.getenv("OSATLAS_LEAN_API", "false").lower() in ("1", "true")
+OSATLAS_GROUND_API = "/api/ground"
 
 HF_TOKEN = os.getenv("HF_TOKEN")
+# Screenshots are downscaled to fit OSATLAS_INPUT_MAX_SIDE (0 keeps the native size)
+# and sent as OSATLAS_INPUT_FORMAT (png, jpeg or webp); boxes are mapped back exactly.
+OSATLAS_INPUT_MAX_SIDE = int(os.getenv("OSATLAS_INPUT_MAX_SIDE", "1920"))
+OSATLAS_INPUT_FORMAT = os.getenv("OSATLAS_INPUT_FORMAT", "png")
+OSATLAS_INPUT_QUALITY = int(os.getenv("OSATLAS_INPUT_QUALITY", "90"))
+# Per-call timeout, concurrent backend calls and retries of the OS-Atlas client.
+OSATLAS_TIMEOUT = float(os.getenv("OSATLAS_TIMEOUT", "60"))
+OSATLAS_MAX_CONCURRENCY = int(os.getenv("OSATLAS_MAX_CONCURRENCY", "4"))
+OSATLAS_MAX_RETRIES = int(os.getenv("OSATLAS_MAX_RETRIES", "3"))
+# How long calls wait for a local server that is still loading or warming up its
+# model (see its /health/ready endpoint), checking every OSATLAS_READY_POLL_INTERVAL.
+OSATLAS_READY_TIMEOUT = float(os.getenv("OSATLAS_READY_TIMEOUT", "600"))
+OSATLAS_READY_API = "/health/ready"
+OSATLAS_READY_POLL_INTERVAL = 2.0
+# Grounding results remembered per desktop, and for how many seconds.
+GROUNDING_CACHE_SIZE = int(os.getenv("GROUNDING_CACHE_SIZE", "256"))
+GROUNDING_CACHE_TTL = float(os.getenv("GROUNDING_CACHE_TTL", "300"))
+# Pixels around a cached bbox that must be unchanged for the result to be reused.
+GROUNDING_CACHE_MARGIN = 32
+
+# Global budget of grounding calls in flight, across backends and desktops.
+GROUNDING_MAX_CONCURRENCY = int(os.getenv("GROUNDING_MAX_CONCURRENCY", "4"))
+
+# Race the other backend when the chosen one is slower than this percentile of its
+# recent latencies (or than the default delay until enough calls were seen).
+GROUNDING_HEDGED = os.getenv("GROUNDING_HEDGED", "false").lower() in ("1", "true")
+GROUNDING_HEDGE_PERCENTILE = float(os.getenv("GROUNDING_HEDGE_PERCENTILE", "90"))
+GROUNDING_HEDGE_DEFAULT_DELAY = float(os.getenv("GROUNDING_HEDGE_DEFAULT_DELAY", "10"))
+GROUNDING_HEDGE_MIN_SAMPLES = 10
+
+# Grid agent: every step sends only the region picked so far, zoomed so its longer
+# side is GRID_IMAGE_MAX_SIDE, with GRID_ROWS rows and as many columns as keep the
+# cells about square. Refinement stops once a cell is at most GRID_TARGET_CELL_SIZE
+# screen pixels, or after GRID_MAX_STEPS.
+GRID_IMAGE_MAX_SIDE = int(os.getenv("GRID_IMAGE_MAX_SIDE", "768"))
+GRID_ROWS = int(os.getenv("GRID_ROWS", "4"))
+GRID_TARGET_CELL_SIZE = int(os.getenv("GRID_TARGET_CELL_SIZE", "80"))
+GRID_MAX_STEPS = 4
+
+BBox = tuple[int, int, int, int]
+T = TypeVar("T")
+
+# Scheduling priority of grounding calls made in the current context, see scheduler.py.
+grounding_priority: ContextVar[int] = ContextVar(
+    "grounding_priority", default=BACKGROUND
+)
+
+logger = get_logger(__name__)
+
+
+# (filename, content, content type) of a file sent along with a prediction
+UploadFile = tuple[str, bytes, str]
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class EndpointNotFound(Exception):
+    pass
+
+
+class OSAtlasClient:
+    """
+    Long-lived async client for the OS-Atlas Gradio app.
+
+    Talks to Gradio's HTTP API directly over a pooled httpx connection, so the
+    Space is resolved once and many predictions can be in flight without
+    occupying threads. Transient failures are retried with exponential backoff.
+    A local server is waited for until it reports its model ready, again after
+    any failure, instead of timing out while it loads.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        hf_token: Optional[str] = None,
+        max_concurrency: int = OSATLAS_MAX_CONCURRENCY,
+        timeout: float = OSATLAS_TIMEOUT,
+        max_retries: int = OSATLAS_MAX_RETRIES,
+        backoff: float = 0.5,
+        ready_timeout: float = OSATLAS_READY_TIMEOUT,
+    ):
+        self.source = source
+        self.hf_token = hf_token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.ready_timeout = ready_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._http: Optional[httpx.AsyncClient] = None
+        self._api_url: Optional[str] = None
+        self._resolve_lock = asyncio.Lock()
+        # Hugging Face Spaces have no readiness endpoint, Gradio queues calls meanwhile.
+        self._ready = "://" not in source
+        self._ready_lock = asyncio.Lock()
+        self._ready_wait_seconds = 0.0
+        self._calls = 0
+        self._retries = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._uploads = 0
+        self._uploaded_bytes = 0
+        # API names the backend answered 404 for, not to be tried again.
+        self.missing_endpoints: set[str] = set()
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            headers = (
+                {"Authorization": f"Bearer {self.hf_token}"} if self.hf_token else {}
+            )
+            self._http = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self._max_concurrency * 2,
+                    max_keepalive_connections=self._max_concurrency * 2,
+                ),
+            )
+        return self._http
+
+    async def _resolve_api_url(self) -> str:
+        """
+        Resolves `source` (a URL or a Hugging Face Space id) to the Gradio API root, once.
+
+        The API prefix is read from the app's /config: "/gradio_api" on Gradio 5,
+        none on Gradio 4, whose /call and /upload endpoints sit at the root.
+        """
+        async with self._resolve_lock:
+            if self._api_url is None:
+                if "://" in self.source:
+                    host = self.source
+                else:
+                    response = await self._client().get(
+                        f"https://huggingface.co/api/spaces/{self.source}/host"
+                    )
+                    response.raise_for_status()
+                    host = response.json()["host"]
+                host = host.rstrip("/")
+                response = await self._client().get(f"{host}/config")
+                self._raise_for_status(response)
+                config = response.json()
+                version = str(config.get("version", ""))
+                if version.split(".")[0] in ("1", "2", "3"):
+                    raise Exception(
+                        f"OS-Atlas at {host} runs Gradio {version}, 4 or newer is required."
+                    )
+                self._api_url = f"{host}{config.get('api_prefix', '').rstrip('/')}"
+                logger.info(
+                    f"Resolved OS-Atlas source {self.source} to {self._api_url} (Gradio {version})"
+                )
+            return self._api_url
+
+    async def _wait_until_ready(self):
+        """Polls the local server's readiness endpoint until its model is loaded and warmed up."""
+        if self._ready:
+            return
+        async with self._ready_lock:
+            started = time.monotonic()
+            logged = False
+            while not self._ready:
+                try:
+                    response = await self._client().get(
+                        f"{self.source.rstrip('/')}{OSATLAS_READY_API}",
+                        params={"load": "true"},
+                    )
+                    # Servers without the endpoint are ready whenever they answer.
+                    self._ready = response.status_code in (200, 404)
+                    status = response.json().get("status") if not self._ready else None
+                except (httpx.TransportError, ValueError) as e:
+                    status = str(e) or type(e).__name__
+                if self._ready:
+                    break
+                waited = time.monotonic() - started
+                if waited > self.ready_timeout:
+                    raise Exception(
+                        f"OS-Atlas at {self.source} not ready after {waited:.0f}s: {status}"
+                    )
+                if not logged:
+                    logger.info(f"Waiting for OS-Atlas at {self.source}: {status}")
+                    logged = True
+                await asyncio.sleep(OSATLAS_READY_POLL_INTERVAL)
+            self._ready_wait_seconds += time.monotonic() - started
+
+    async def _upload(self, api_url: str, file: UploadFile) -> dict[str, Any]:
+        filename, content, content_type = file
+        response = await self._client().post(
+            f"{api_url}/upload", files={"files": (filename, content, content_type)}
+        )
+        self._raise_for_status(response)
+        self._uploads += 1
+        self._uploaded_bytes += len(content)
+        return {"path": response.json()[0], "meta": {"_type": "gradio.FileData"}}
+
+    async def _call(self, api_url: str, api_name: str, data: list[Any]) -> list[Any]:
+        name = api_name.lstrip("/")
+        response = await self._client().post(
+            f"{api_url}/call/{name}", json={"data": data}
+        )
+        if response.status_code == 404:
+            logger.warning(f"OS-Atlas has no {api_name} endpoint.")
+            self.missing_endpoints.add(api_name)
+            raise EndpointNotFound(f"OS-Atlas has no {api_name} endpoint.")
+        self._raise_for_status(response)
+        event_id = response.json()["event_id"]
+
+        event = None
+        async with self._client().stream(
+            "GET", f"{api_url}/call/{name}/{event_id}"
+        ) as events:
+            self._raise_for_status(events)
+            async for line in events.aiter_lines():
+                if line.startswith("event:"):
+                    event = line.removeprefix("event:").strip()
+                elif line.startswith("data:") and event in ("complete", "error"):
+                    payload = line.removeprefix("data:").strip()
+                    if event == "error":
+                        raise Exception(f"OS-Atlas prediction failed: {payload}")
+                    return json.loads(payload)
+        raise _RetryableError("OS-Atlas event stream ended without a result.")
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response):
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryableError(
+                f"OS-Atlas returned HTTP {response.status_code} for {response.url}"
+            )
+        response.raise_for_status()
+
+    async def predict(
+        self,
+        api_name: str,
+        data: list[Any],
+        files: Optional[dict[int, UploadFile]] = None,
+    ) -> list[Any]:
+        """
+        Calls `api_name` with positional `data`.
+
+        `files` maps positions in `data` to in-memory files, which are uploaded
+        and passed as Gradio file references.
+        """
+        if api_name in self.missing_endpoints:
+            raise EndpointNotFound(f"OS-Atlas has no {api_name} endpoint.")
+        return await self._run(lambda: self._predict(api_name, data, files or {}))
+
+    async def _predict(
+        self, api_name: str, data: list[Any], files: dict[int, UploadFile]
+    ) -> list[Any]:
+        api_url = await self._resolve_api_url()
+        payload = list(data)
+        for index, file in files.items():
+            payload[index] = await self._upload(api_url, file)
+        return await asyncio.wait_for(
+            self._call(api_url, api_name, payload), self.timeout
+        )
+
+    async def ground(
+        self, elements: list[str], file: UploadFile, model: str
+    ) -> list[Optional[list[float]]]:
+        """
+        Grounds `elements` on the image `file` with the local server's lean
+        endpoint, bypassing Gradio. Returns a box in image pixels (or None) per element.
+        """
+        if "://" not in self.source:
+            raise Exception(f"OS-Atlas source {self.source} has no lean endpoint.")
+        return await self._run(lambda: self._ground(elements, file, model))
+
+    async def _ground(
+        self, elements: list[str], file: UploadFile, model: str
+    ) -> list[Optional[list[float]]]:
+        _, content, content_type = file
+        response = await self._client().post(
+            f"{self.source.rstrip('/')}{OSATLAS_GROUND_API}",
+            params={"element": elements, "model_id": model},
+            content=content,
+            headers={"Content-Type": content_type},
+        )
+        self._raise_for_status(response)
+        self._uploads += 1
+        self._uploaded_bytes += len(content)
+        return response.json()["boxes"]
+
+    async def _run(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Runs `attempt()` under the concurrency limit, retrying transient failures."""
+        self._calls += 1
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                return await self._retry(attempt)
+            except Exception:
+                self._failed += 1
+                raise
+            finally:
+                self._in_flight -= 1
+
+    async def _retry(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        for attempt_number in range(self.max_retries + 1):
+            try:
+                await self._wait_until_ready()
+                return await attempt()
+            except (_RetryableError, httpx.TransportError, TimeoutError) as e:
+                # The server may be restarting or reloading its model.
+                self._ready = "://" not in self.source
+                if attempt_number == self.max_retries:
+                    raise Exception(
+                        f"OS-Atlas request failed after {attempt_number + 1} attempts: {e}"
+                    ) from e
+                delay = self.backoff * 2**attempt_number
+                logger.warning(
+                    f"OS-Atlas request failed ({e}), retrying in {delay:.1f}s."
+                )
+                self._retries += 1
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "api_url": self._api_url,
+            "max_concurrency": self._max_concurrency,
+            "calls": self._calls,
+            "retries": self._retries,
+            "failed": self._failed,
+            "in_flight": self._in_flight,
+            "ready": self._ready,
+            "ready_wait_seconds": self._ready_wait_seconds,
+            "uploads": self._uploads,
+            "avg_upload_bytes": (
+                self._uploaded_bytes / self._uploads if self._uploads else 0
+            ),
+        }
+
+    async def aclose(self):
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+
+osatlas_client = OSAtlasClient(OSATLAS_HUGGINGFACE_SOURCE, hf_token=HF_TOKEN)
+
+
+def normalize_element(element: str) -> str:
+    return " ".join(element.lower().split())
+
+
+def _region_around(
+    bbox: BBox, shape: tuple[int, ...], margin: int
+) -> tuple[int, int, int, int]:
+    height, width = shape[:2]
+    x1, x2 = sorted((bbox[0], bbox[2]))
+    y1, y2 = sorted((bbox[1], bbox[3]))
+    return (
+        max(0, x1 - margin),
+        max(0, y1 - margin),
+        min(width, x2 + margin),
+        min(height, y2 + margin),
+    )
+
+
+def region_hash(pixels: np.ndarray, region: tuple[int, int, int, int]) -> bytes:
+    x1, y1, x2, y2 = region
+    crop = np.ascontiguousarray(pixels[y1:y2, x1:x2])
+    return hashlib.blake2b(crop.data, digest_size=16).digest()
+
+
+def memory_key(
+    vnc_manager: VNCManager, element: str, shape: tuple[int, ...]
+) -> tuple[str, int, tuple[int, int], str]:
+    """The element memory key of `element` on the desktop of `vnc_manager` at frame `shape`."""
+    return vnc_manager.host, vnc_manager.port, shape[:2], normalize_element(element)
+
+
+class _CachedBBox:
+    __slots__ = ("bbox", "recalled", "shape", "region", "digest", "expires_at")
+
+    def __init__(
+        self,
+        bbox: BBox,
+        pixels: np.ndarray,
+        margin: int,
+        ttl: float,
+        recalled: bool = False,
+    ):
+        self.bbox = bbox
+        self.recalled = recalled  # Found by the element memory, not a model
+        self.shape = pixels.shape
+        self.region = _region_around(bbox, pixels.shape, margin)
+        self.digest = region_hash(pixels, self.region)
+        self.expires_at = time.monotonic() + ttl
+
+
+class GroundingCache:
+    """
+    LRU/TTL cache of grounding results, keyed by desktop, backend and normalized element text.
+
+    An entry also records a hash of the screen region around its bbox and is
+    only reused while the live framebuffer still hashes the same there, so a
+    retried click on an unchanged screen skips the model entirely while any
+    change near the element invalidates it. Invalidating a bbox that came from
+    the element memory also makes the memory forget that element.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = GROUNDING_CACHE_SIZE,
+        ttl: float = GROUNDING_CACHE_TTL,
+        margin: int = GROUNDING_CACHE_MARGIN,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.margin = margin
+        self._entries: OrderedDict[tuple[str, int, str, str], _CachedBBox] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(
+        vnc_manager: VNCManager, backend: str, element: str
+    ) -> tuple[str, int, str, str]:
+        return vnc_manager.host, vnc_manager.port, backend, normalize_element(element)
+
+    def get(
+        self, vnc_manager: VNCManager, backend: str, element: str
+    ) -> Optional[BBox]:
+        """The cached bbox of `element` if the screen around it is unchanged, else None."""
+        key = self._key(vnc_manager, backend, element)
+        entry = self._entries.get(key)
+        if entry is None or vnc_manager.framebuffer is None:
+            self.misses += 1
+            return None
+
+        # The framebuffer is only written on the event loop, so it can be read
+        # here without a copy.
+        pixels = vnc_manager.framebuffer.pixels
+        if entry.expires_at < time.monotonic():
+            self.expirations += 1
+            del self._entries[key]
+        elif pixels.shape != entry.shape or (
+            region_hash(pixels, entry.region) != entry.digest
+        ):
+            self.invalidations += 1
+            del self._entries[key]
+            if entry.recalled:
+                element_memory.forget(memory_key(vnc_manager, element, entry.shape))
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.bbox
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        vnc_manager: VNCManager,
+        backend: str,
+        element: str,
+        bbox: BBox,
+        pixels: np.ndarray,
+        recalled: bool = False,
+    ):
+        """Remembers `bbox` for `element` as found on the screenshot `pixels`."""
+        key = self._key(vnc_manager, backend, element)
+        self._entries[key] = _CachedBBox(bbox, pixels, self.margin, self.ttl, recalled)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
+
+
+grounding_cache = GroundingCache()
+grounding_scheduler = PriorityScheduler(GROUNDING_MAX_CONCURRENCY)
 
 
 def extract_bbox_midpoint(bbox: tuple[int, int, int, int]) -> tuple[int, int]:
     return int((bbox[0] + bbox[2]) // 2), int((bbox[1] + bbox[3]) // 2)
 
 
-@asyncify
-def _os_atlas_query_element_bbox(
-    element: str, image_data_url: str
-) -> tuple[int, int, int, int]:
-    client = Client(OSATLAS_HUGGINGFACE_SOURCE, hf_token=HF_TOKEN)
-    result = client.predict(
-        image=handle_file(image_data_url),
-        text_input=element + "\nReturn the response in the form of a bbox",
-        model_id=OSATLAS_HUGGINGFACE_MODEL,
-        api_name=OSATLAS_HUGGINGFACE_API,
+class GroundingImage(NamedTuple):
+    """A screenshot as sent to OS-Atlas, with the factors mapping it back to the screen."""
+
+    data: bytes
+    format: str
+    scale_x: float
+    scale_y: float
+
+    def upload_file(self) -> UploadFile:
+        _, mime_type = STREAM_FORMATS[self.format]
+        extension = "jpg" if self.format == "jpeg" else self.format
+        return f"screenshot-{uuid.uuid4().hex}.{extension}", self.data, mime_type
+
+    def to_screen(self, box: list[float]) -> BBox:
+        """Maps a box in sent-image pixels to screen pixels."""
+        x1, y1, x2, y2 = box
+        return (
+            round(x1 * self.scale_x),
+            round(y1 * self.scale_y),
+            round(x2 * self.scale_x),
+            round(y2 * self.scale_y),
+        )
+
+
+def _encode_grounding_image(
+    screenshot_pil: Image.Image, max_side: int, format: str, quality: int
+) -> GroundingImage:
+    size = fit_size(screenshot_pil.size, max_side, max_side)
+    image = screenshot_pil
+    if size != screenshot_pil.size:
+        image = screenshot_pil.resize(size, Image.Resampling.LANCZOS)
+    return GroundingImage(
+        encode_stream_frame(image, format, quality),
+        format,
+        screenshot_pil.width / size[0],
+        screenshot_pil.height / size[1],
+    )
+
+
+async def encode_grounding_image(screenshot_pil: Image.Image) -> GroundingImage:
+    return await image_encoder.run(
+        _encode_grounding_image,
+        screenshot_pil,
+        OSATLAS_INPUT_MAX_SIDE,
+        OSATLAS_INPUT_FORMAT,
+        OSATLAS_INPUT_QUALITY,
     )
 
-    match = BBOX_PATTERN.search(result[1])
-    inner_text = match.group(1) if match else result[1]
-    bbox = [int(round(float(num))) for num in COORDS_PATTERN.findall(inner_text)]
-    if len(bbox) == 4:
-        return (bbox[0], bbox[1], bbox[2], bbox[3])
-    raise Exception(f"Unexpected bbox format: {result[1]}")
 
+def parse_box(text: str) -> list[float]:
+    """Coordinates of the (first) box in a model answer, as sent-image pixels."""
+    match = BBOX_PATTERN.search(text)
+    inner_text = match.group(1) if match else text
+    box = [float(num) for num in COORDS_PATTERN.findall(inner_text)]
+    if len(box) != 4:
+        raise Exception(f"Unexpected bbox format: {text}")
+    return box
 
-async def os_atlas_query_element_bbox(element: str):
-    vnc_manager = VNCManager.get()
-    if not vnc_manager or not vnc_manager.is_connected:
-        raise ConnectionError("VNC manager not available or not connected.")
-    screenshot_pil = await vnc_manager.capture_screen_pil()
-    # Using a temporary file like this is not ideal, especially in async code.
-    # Consider passing bytes directly if possible, or ensure unique filenames if concurrent use.
-    # For now, retaining existing logic but noting this.
-    temp_file_path = "temp_screenshot_os_atlas.png"  # Make filename more specific
-    with open(temp_file_path, "wb") as f:
-        f.write(image_bytes(screenshot_pil))
-    bbox = await _os_atlas_query_element_bbox(element, temp_file_path)
-    # It's good practice to clean up temporary files.
-    # os.remove(temp_file_path) # Add this if appropriate for your environment
-    return bbox, screenshot_pil
 
+async def _os_atlas_query_element_bbox(element: str, image: GroundingImage) -> BBox:
+    if OSATLAS_LEAN_API:
+        return (await _os_atlas_query_element_bboxes([element], image))[0]
+    # run_example(image, text_input, model_id)
+    result = await osatlas_client.predict(
+        OSATLAS_HUGGINGFACE_API,
+        [
+            None,
+            element + "\nReturn the response in the form of a bbox",
+            OSATLAS_HUGGINGFACE_MODEL,
+        ],
+        files={0: image.upload_file()},
+    )
+    return image.to_screen(parse_box(result[1]))
 
-async def grounding_agent_query_element_bbox(element: str, steps: int = 2):
-    from planar_computer_use.agents import grounding_agent
 
-    vnc_manager = VNCManager.get()
-    if not vnc_manager or not vnc_manager.is_connected:
-        raise ConnectionError(
-            "VNC manager not available or not connected for grounding_agent_query_element_bbox."
+async def _os_atlas_query_element_bboxes(
+    elements: list[str], image: GroundingImage
+) -> list[BBox]:
+    """Grounds all `elements` in one batched request, or concurrently if the backend can't batch."""
+    text_inputs = [
+        element + "\nReturn the response in the form of a bbox" for element in elements
+    ]
+    if OSATLAS_LEAN_API:
+        boxes = await osatlas_client.ground(
+            text_inputs, image.upload_file(), OSATLAS_HUGGINGFACE_MODEL
         )
+    else:
+        try:
+            # run_batch(image, text_inputs, model_id)
+            result = await osatlas_client.predict(
+                OSATLAS_BATCH_API,
+                [None, json.dumps(text_inputs), OSATLAS_HUGGINGFACE_MODEL],
+                files={0: image.upload_file()},
+            )
+        except EndpointNotFound:
+            # Older backends can only ground one element per request.
+            return list(
+                await asyncio.gather(
+                    *(
+                        _os_atlas_query_element_bbox(element, image)
+                        for element in elements
+                    )
+                )
+            )
+        boxes = json.loads(result[0])
+
+    bboxes = []
+    for element, box in zip(elements, boxes, strict=True):
+        if not box or len(box) != 4:
+            raise Exception(f"Unexpected bbox for {element!r}: {box}")
+        bboxes.append(image.to_screen([float(value) for value in box]))
+    return bboxes
+
+
+async def os_atlas_query_element_bbox(
+    element: str, screenshot_pil: Optional[Image.Image] = None
+):
+    if screenshot_pil is None:
+        screenshot_pil = await _connected_vnc_manager().capture_screen_pil()
+    bbox = await _os_atlas_query_element_bbox(
+        element, await encode_grounding_image(screenshot_pil)
+    )
+    return bbox, screenshot_pil
+
+
+def _grid_shape(rect: BBox) -> tuple[int, int]:
+    width, height = rect[2] - rect[0], rect[3] - rect[1]
+    rows = min(GRID_ROWS, max(1, height))
+    cols = max(1, min(round(rows * width / height), 2 * GRID_ROWS, width))
+    return rows, cols
 
-    screenshot_pil = await vnc_manager.capture_screen_pil()  # Initial screenshot
-    target_rect = None  # Initialize target_rect
 
-    # steps = 2 # Parameter is already defaulted and can be overridden by caller
+async def grounding_agent_query_element_bbox(
+    element: str,
+    steps: Optional[int] = None,
+    screenshot_pil: Optional[Image.Image] = None,
+):
+    """
+    Narrows down `element` by repeatedly asking the grid agent to pick a grid cell.
 
-    for _ in range(steps):
-        annotated_screenshot, cells = draw_annotated_grid(
-            screenshot_pil, num_rows=4, num_cols=4, target_rect=target_rect
+    Each step only sends the cell picked in the previous one, upscaled to a fixed
+    size. Without `steps`, refinement continues until cells are small enough on
+    screen, so larger screens get more steps.
+    """
+    from planar_computer_use.agents import grounding_agent
+
+    if screenshot_pil is None:
+        screenshot_pil = await _connected_vnc_manager().capture_screen_pil()
+    target_rect: BBox = (0, 0, screenshot_pil.width, screenshot_pil.height)
+
+    for _ in range(steps or GRID_MAX_STEPS):
+        rows, cols = _grid_shape(target_rect)
+        annotated_screenshot, cells = await image_encoder.run(
+            draw_zoomed_grid,
+            screenshot_pil,
+            target_rect,
+            GRID_IMAGE_MAX_SIDE,
+            rows,
+            cols,
         )
         screenshot_file = await upload_screenshot(annotated_screenshot)
         screenshot_with_prompt = ScreenshotWithPrompt(
@@ -89,20 +707,297 @@ async def grounding_agent_query_element_bbox(element: str, steps: int = 2):
         )
         response = await grounding_agent(screenshot_with_prompt)
         cell_number = int(response.output.strip())
+        if not 0 <= cell_number < len(cells):
+            raise Exception(f"Grounding agent could not find {element!r}.")
         target_rect = cells[cell_number]
 
-    assert target_rect
+        cell_size = max(
+            target_rect[2] - target_rect[0], target_rect[3] - target_rect[1]
+        )
+        if steps is None and cell_size <= GRID_TARGET_CELL_SIZE:
+            break
+
     return target_rect, screenshot_pil
 
 
-async def query_element_bbox(element: str, grounding_agent: bool = False):
+class BackendStats:
+    """Recent latencies and hedging outcomes of one grounding backend."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.hedged_calls = 0
+        self.wins = 0
+
+    def record(self, seconds: float):
+        self.calls += 1
+        self.latencies.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return float(np.percentile(self.latencies, percent))
+
+    def hedge_delay(self) -> float:
+        """How long to wait for this backend before also asking the other one."""
+        if len(self.latencies) < GROUNDING_HEDGE_MIN_SAMPLES:
+            return GROUNDING_HEDGE_DEFAULT_DELAY
+        delay = self.percentile(GROUNDING_HEDGE_PERCENTILE)
+        assert delay is not None
+        return delay
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "hedged_calls": self.hedged_calls,
+            "wins": self.wins,
+            "win_rate": self.wins / self.hedged_calls if self.hedged_calls else None,
+        }
+
+
+backend_stats = {
+    "os_atlas": BackendStats(),
+    "grounding_agent": BackendStats(),
+}
+
+
+def _backend_name(grounding_agent: bool, hedged: bool = False) -> str:
+    """Cache/scheduling name of a backend; hedged modes are "primary+secondary"."""
+    primary, secondary = "os_atlas", "grounding_agent"
     if grounding_agent:
-        return await grounding_agent_query_element_bbox(element)
-    else:
-        return await os_atlas_query_element_bbox(element)
+        primary, secondary = secondary, primary
+    return f"{primary}+{secondary}" if hedged else primary
+
+
+async def _ground(backend: str, element: str, screenshot_pil: Image.Image) -> BBox:
+    if "+" in backend:
+        primary, secondary = backend.split("+")
+        return await _hedged_ground(primary, secondary, element, screenshot_pil)
+
+    stats = backend_stats[backend]
+    started = time.monotonic()
+    try:
+        if backend == "grounding_agent":
+            bbox, _ = await grounding_agent_query_element_bbox(
+                element, screenshot_pil=screenshot_pil
+            )
+        else:
+            bbox, _ = await os_atlas_query_element_bbox(element, screenshot_pil)
+    except Exception:
+        stats.failures += 1
+        raise
+    stats.record(time.monotonic() - started)
+    return bbox
 
 
-async def query_element_position(element: str, vlm: bool = False):
-    bbox, _ = await query_element_bbox(element, grounding_agent=vlm)
+async def _hedged_ground(
+    primary: str, secondary: str, element: str, screenshot_pil: Image.Image
+) -> BBox:
+    """
+    Asks `primary`, and `secondary` too if primary is slower than usual or fails.
+
+    The deadline is a high percentile of primary's recent latencies, so only its
+    tail is hedged. The first answer wins and the other call is cancelled.
+    """
+    first = asyncio.create_task(_ground(primary, element, screenshot_pil))
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(
+            pending, timeout=backend_stats[primary].hedge_delay()
+        )
+        if done and not first.exception():
+            return first.result()
+        if done:
+            pending = set()  # Failed fast, let the secondary answer alone
+            logger.warning(
+                f"{primary} grounding failed ({first.exception()}), trying {secondary}."
+            )
+
+        backend_stats[primary].hedged_calls += 1
+        backend_stats[secondary].hedged_calls += 1
+        tasks = {
+            asyncio.create_task(_ground(secondary, element, screenshot_pil)): secondary
+        }
+        if first in pending:
+            tasks[first] = primary
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    backend_stats[tasks[task]].wins += 1
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _capture(vnc_manager: VNCManager) -> tuple[Image.Image, int]:
+    screenshot_pil = await vnc_manager.capture_screen_pil()
+    # Read right after the capture returns, so it identifies exactly that screenshot.
+    return screenshot_pil, vnc_manager.frame_sequence
+
+
+async def _recall(
+    vnc_manager: VNCManager, backend: str, element: str, pixels: np.ndarray
+) -> Optional[BBox]:
+    """Looks `element` up in the local element memory, without asking a model."""
+    key = memory_key(vnc_manager, element, pixels.shape)
+    bbox = await element_memory.locate(key, pixels)
+    if bbox is not None:
+        grounding_cache.put(vnc_manager, backend, element, bbox, pixels, recalled=True)
+    return bbox
+
+
+async def _query_element_bbox_uncached(
+    vnc_manager: VNCManager,
+    element: str,
+    backend: str,
+    screenshot: Optional[tuple[Image.Image, int]] = None,
+    recall: bool = True,
+):
+    screenshot_pil, sequence = screenshot or await _capture(vnc_manager)
+    pixels = np.asarray(screenshot_pil)
+    if recall:
+        bbox = await _recall(vnc_manager, backend, element, pixels)
+        if bbox is not None:
+            return bbox, screenshot_pil
+
+    async def query() -> BBox:
+        bbox = await _ground(backend, element, screenshot_pil)
+        grounding_cache.put(vnc_manager, backend, element, bbox, pixels)
+        element_memory.remember(
+            memory_key(vnc_manager, element, pixels.shape), pixels, bbox
+        )
+        return bbox
+
+    key = (
+        vnc_manager.host,
+        vnc_manager.port,
+        backend,
+        sequence,
+        normalize_element(element),
+    )
+    bbox = await grounding_scheduler.run(key, query, grounding_priority.get())
+    return bbox, screenshot_pil
+
+
+def _connected_vnc_manager() -> VNCManager:
+    vnc_manager = VNCManager.get()
+    if not vnc_manager or not vnc_manager.is_connected:
+        raise ConnectionError("VNC manager not available or not connected.")
+    return vnc_manager
+
+
+async def query_element_bbox(
+    element: str, grounding_agent: bool = False, hedged: bool = GROUNDING_HEDGED
+):
+    """
+    Grounds `element` on the current screen, returning its bbox and the screenshot.
+
+    `grounding_agent` picks the grid agent instead of OS-Atlas; with `hedged`, the
+    other backend is raced against it when it is slow.
+    """
+    vnc_manager = _connected_vnc_manager()
+    backend = _backend_name(grounding_agent, hedged)
+    # Checked against the screen as changed by the last input.
+    await vnc_manager.refresh_framebuffer()
+    bbox = grounding_cache.get(vnc_manager, backend, element)
+    if bbox is not None:
+        return bbox, await vnc_manager.capture_screen_pil()
+    return await _query_element_bbox_uncached(vnc_manager, element, backend)
+
+
+async def query_element_position(
+    element: str, vlm: bool = False, hedged: bool = GROUNDING_HEDGED
+):
+    vnc_manager = _connected_vnc_manager()
+    backend = _backend_name(vlm, hedged)
+    # A cache hit needs no screenshot, only a framebuffer that reflects the last input.
+    await vnc_manager.refresh_framebuffer()
+    bbox = grounding_cache.get(vnc_manager, backend, element)
+    if bbox is None:
+        bbox, _ = await _query_element_bbox_uncached(vnc_manager, element, backend)
     x, y = extract_bbox_midpoint(bbox)
     return x, y
+
+
+async def query_element_bboxes(
+    elements: list[str], grounding_agent: bool = False
+) -> tuple[list[BBox], Image.Image]:
+    """
+    Grounds several elements on a single screenshot.
+
+    Cached and remembered elements are answered locally. With OS-Atlas the rest is
+    sent as one batched request; the grid agent resolves them concurrently.
+    """
+    vnc_manager = _connected_vnc_manager()
+    backend = _backend_name(grounding_agent)
+    screenshot_pil, sequence = await _capture(vnc_manager)
+    pixels = np.asarray(screenshot_pil)
+    bboxes = [
+        grounding_cache.get(vnc_manager, backend, element) for element in elements
+    ]
+    missing = [element for element, bbox in zip(elements, bboxes) if bbox is None]
+    recalled = await asyncio.gather(
+        *(_recall(vnc_manager, backend, element, pixels) for element in missing)
+    )
+    remembered = {
+        element: bbox for element, bbox in zip(missing, recalled) if bbox is not None
+    }
+    missing = [element for element in missing if element not in remembered]
+
+    if missing and grounding_agent:
+        results = await asyncio.gather(
+            *(
+                _query_element_bbox_uncached(
+                    vnc_manager,
+                    element,
+                    backend,
+                    (screenshot_pil, sequence),
+                    recall=False,
+                )
+                for element in missing
+            )
+        )
+        resolved = dict(zip(missing, (bbox for bbox, _ in results)))
+    elif missing:
+
+        async def query() -> list[BBox]:
+            found = await _os_atlas_query_element_bboxes(
+                missing, await encode_grounding_image(screenshot_pil)
+            )
+            for element, bbox in zip(missing, found):
+                grounding_cache.put(vnc_manager, backend, element, bbox, pixels)
+                element_memory.remember(
+                    memory_key(vnc_manager, element, pixels.shape), pixels, bbox
+                )
+            return found
+
+        key = (
+            vnc_manager.host,
+            vnc_manager.port,
+            backend,
+            sequence,
+            tuple(normalize_element(element) for element in missing),
+        )
+        found = await grounding_scheduler.run(key, query, grounding_priority.get())
+        resolved = dict(zip(missing, found))
+    else:
+        resolved = {}
+    resolved.update(remembered)
+
+    return [
+        bbox if bbox is not None else resolved[element]
+        for element, bbox in zip(elements, bboxes)
+    ], screenshot_pil
@@ -1,5 +1,35 @@
+from collections import OrderedDict
+from functools import lru_cache
+import os
+import threading
 from PIL import Image, ImageDraw, ImageFont
-from typing import Optional  # Use TypingTuple for clarity
+from planar.logging import get_logger
+from typing import NamedTuple, Optional  # Use TypingTuple for clarity
+
+logger = get_logger(__name__)
+
+# Memory for grid overlays kept for reuse, one per (size, grid, styling)
+# combination; least recently used ones are dropped past it.
+GRID_OVERLAY_CACHE_MB = float(os.getenv("GRID_OVERLAY_CACHE_MB", "256"))
+# Overlays are split in tiles of this size, and only their drawn parts are kept.
+GRID_OVERLAY_TILE_SIZE = 32
+
+
+@lru_cache(maxsize=16)
+def load_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """Loads Arial at `size`, falling back to PIL's default font. Cached per size."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        font_fallback_message = "Arial font not found. Using default PIL font. "
+        try:
+            font = ImageFont.load_default(size=size)  # Pillow 10.0.0+
+            font_fallback_message += "Using resizable default font (Pillow 10.0.0+)."
+        except TypeError:
+            font = ImageFont.load_default()
+            font_fallback_message += "Number size may not be as specified. Consider installing Arial or upgrading Pillow for resizable default font."
+        logger.warning(font_fallback_message)
+        return font
 
 
 def draw_annotated_grid(
@@ -51,15 +81,149 @@ def draw_annotated_grid(
     if num_cols <= 0:
         raise ValueError("num_cols must be positive.")
 
-    # Ensure PIL types are available. These would typically be imported at the top of the file.
-    # from PIL import Image, ImageDraw, ImageFont
-    # The following lines assume ImageDraw and ImageFont are available in the global scope
-    # or correctly imported (e.g., via `from PIL import ImageDraw, ImageFont`).
-
+    overlay = _grid_overlay(
+        image.size,
+        num_rows,
+        num_cols,
+        number_font_size,
+        grid_line_color,
+        grid_line_width,
+        text_color,
+        target_rect,
+        target_rect_outline_color,
+        target_rect_outline_width,
+    )
     img = image.convert("RGBA")
-    draw = ImageDraw.Draw(img, "RGBA")
+    for piece in overlay.pieces:
+        img.paste(piece.ink, piece.offset, piece.coverage)
+    return img, list(overlay.cells)
+
+
+class _OverlayPiece(NamedTuple):
+    offset: tuple[int, int]  # Position in the image
+    ink: Image.Image  # RGBA colors of the drawn pixels
+    coverage: Image.Image  # L mask of how much of each pixel is drawn over
+
+
+class _GridOverlay(NamedTuple):
+    pieces: tuple[_OverlayPiece, ...]  # Disjoint, so each pixel is pasted once
+    cells: tuple[tuple[int, int, int, int], ...]
+
+    @property
+    def nbytes(self) -> int:
+        # RGBA ink plus L coverage
+        return sum(piece.ink.width * piece.ink.height * 5 for piece in self.pieces)
+
+
+class _OverlayCache:
+    """LRU cache of grid overlays, bounded by the memory of their layers."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._overlays: OrderedDict[tuple, _GridOverlay] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()  # Grids are drawn on encoder threads
+
+    def get(self, key: tuple) -> Optional[_GridOverlay]:
+        with self._lock:
+            overlay = self._overlays.get(key)
+            if overlay is not None:
+                self._overlays.move_to_end(key)
+            return overlay
+
+    def put(self, key: tuple, overlay: _GridOverlay):
+        with self._lock:
+            old = self._overlays.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._overlays[key] = overlay
+            self._bytes += overlay.nbytes
+            while self._overlays and self._bytes > self.max_bytes:
+                _, dropped = self._overlays.popitem(last=False)
+                self._bytes -= dropped.nbytes
+
+
+_grid_overlays = _OverlayCache(int(GRID_OVERLAY_CACHE_MB * 1024**2))
+
+
+class _LayerDraw:
+    """
+    Draws on an ink layer while recording in a coverage mask how much of each
+    pixel every shape drew over, so pasting the ink through the mask gives the
+    same pixels as drawing directly on the image.
+
+    The ink layer starts out filled with the text color: anti-aliased text edges
+    then keep the exact text color wherever they do not overlap another shape.
+    """
+
+    def __init__(self, size: tuple[int, int], text_color: tuple[int, int, int, int]):
+        self.ink = Image.new("RGBA", size, text_color)
+        self.coverage = Image.new("L", size, 0)
+        self._ink_draw = ImageDraw.Draw(self.ink)
+        self._coverage_draw = ImageDraw.Draw(self.coverage)
 
-    img_full_width, img_full_height = img.size
+    def rectangle(self, xy, outline, width: int):
+        self._ink_draw.rectangle(xy, outline=outline, width=width)
+        self._coverage_draw.rectangle(xy, outline=255, width=width)
+
+    def line(self, xy, fill, width: int):
+        self._ink_draw.line(xy, fill=fill, width=width)
+        self._coverage_draw.line(xy, fill=255, width=width)
+
+    def text(self, xy, text: str, font, fill, **kwargs):
+        self._ink_draw.text(xy, text, font=font, fill=fill, **kwargs)
+        self._coverage_draw.text(xy, text, font=font, fill=255, **kwargs)
+
+    def textbbox(self, xy, text: str, font):
+        return self._ink_draw.textbbox(xy, text, font=font)
+
+    def overlay(self, cells: tuple[tuple[int, int, int, int], ...]) -> _GridOverlay:
+        """The drawn parts of both layers, cropped tile by tile."""
+        pieces = []
+        width, height = self.coverage.size
+        size = GRID_OVERLAY_TILE_SIZE
+        for top in range(0, height, size):
+            for left in range(0, width, size):
+                tile = self.coverage.crop((left, top, left + size, top + size))
+                bbox = tile.getbbox()
+                if bbox is None:
+                    continue
+                x1, y1, x2, y2 = bbox
+                box = (left + x1, top + y1, left + x2, top + y2)
+                pieces.append(
+                    _OverlayPiece(box[:2], self.ink.crop(box), self.coverage.crop(box))
+                )
+        return _GridOverlay(tuple(pieces), cells)
+
+
+def _grid_overlay(*args) -> _GridOverlay:
+    """The cached overlay of `_render_grid_overlay(*args)`, rendered on a miss."""
+    overlay = _grid_overlays.get(args)
+    if overlay is None:
+        overlay = _render_grid_overlay(*args)
+        _grid_overlays.put(args, overlay)
+    return overlay
+
+
+def _render_grid_overlay(
+    size: tuple[int, int],
+    num_rows: int,
+    num_cols: int,
+    number_font_size: int,
+    grid_line_color: tuple[int, int, int, int],
+    grid_line_width: int,
+    text_color: tuple[int, int, int, int],
+    target_rect: Optional[tuple[int, int, int, int]],
+    target_rect_outline_color: Optional[tuple[int, int, int, int]],
+    target_rect_outline_width: int,
+) -> _GridOverlay:
+    """
+    Renders the grid lines and cell numbers of `draw_annotated_grid` for an image
+    of `size`. The returned overlay is shared and must not be modified.
+    """
+    draw = _LayerDraw(size, text_color)
+
+    img_full_width, img_full_height = size
 
     origin_x: float
     origin_y: float
@@ -79,8 +243,8 @@ def draw_annotated_grid(
         rect_height = effective_ty2 - effective_ty1
 
         if rect_width <= 0 or rect_height <= 0:
-            print(
-                f"Warning: Target rectangle has zero or negative effective width/height ({rect_width}x{rect_height}). Grid not drawn."
+            logger.warning(
+                f"Target rectangle has zero or negative effective width/height ({rect_width}x{rect_height}). Grid not drawn."
             )
             if target_rect_outline_color:
                 draw.rectangle(
@@ -95,7 +259,7 @@ def draw_annotated_grid(
                 round(effective_ty2),
             )
             total_cells = num_rows * num_cols
-            return img, [coords] * total_cells
+            return draw.overlay((coords,) * total_cells)
 
         if target_rect_outline_color:
             draw.rectangle(
@@ -110,17 +274,7 @@ def draw_annotated_grid(
     cell_width = rect_width / float(num_cols)
     cell_height = rect_height / float(num_rows)
 
-    try:
-        font = ImageFont.truetype("arial.ttf", number_font_size)
-    except IOError:
-        font_fallback_message = "Arial font not found. Using default PIL font. "
-        try:
-            font = ImageFont.load_default(size=number_font_size)  # Pillow 10.0.0+
-            font_fallback_message += "Using resizable default font (Pillow 10.0.0+)."
-        except TypeError:
-            font = ImageFont.load_default()
-            font_fallback_message += "Number size may not be as specified. Consider installing Arial or upgrading Pillow for resizable default font."
-        print(font_fallback_message)
+    font = load_font(number_font_size)
 
     # --- 1. Draw grid lines ---
     if rect_width > 0 and rect_height > 0:  # Only draw lines if the rect is valid
@@ -213,7 +367,41 @@ def draw_annotated_grid(
                     (text_x_pos, text_y_pos), text_to_draw, font=font, fill=text_color
                 )
 
-    return img, cell_coordinates_list
+    return draw.overlay(tuple(cell_coordinates_list))
+
+
+def draw_zoomed_grid(
+    image: Image.Image,
+    rect: tuple[int, int, int, int],
+    max_side: int,
+    num_rows: int,
+    num_cols: int,
+) -> tuple[Image.Image, list[tuple[int, int, int, int]]]:
+    """
+    Crops `rect` (x1, y1, x2, y2) out of `image`, scales it so its longer side is
+    `max_side` and draws an annotated grid on it.
+
+    Returns the zoomed image and the cell coordinates, mapped back to be absolute
+    to the original `image`.
+    """
+    x1, y1, x2, y2 = rect
+    crop = image.crop((x1, y1, x2, y2))
+    scale = max_side / max(crop.width, crop.height)
+    size = (max(1, round(crop.width * scale)), max(1, round(crop.height * scale)))
+    zoomed = crop.resize(size, Image.Resampling.LANCZOS)
+    annotated, cells = draw_annotated_grid(zoomed, num_rows=num_rows, num_cols=num_cols)
+
+    scale_x = crop.width / size[0]
+    scale_y = crop.height / size[1]
+    return annotated, [
+        (
+            x1 + round(cx1 * scale_x),
+            y1 + round(cy1 * scale_y),
+            x1 + round(cx2 * scale_x),
+            y1 + round(cy2 * scale_y),
+        )
+        for cx1, cy1, cx2, cy2 in cells
+    ]
 
 
 def draw_bounding_box(image: Image.Image, box: tuple[int, int, int, int]):
@@ -221,3 +409,9 @@ def draw_bounding_box(image: Image.Image, box: tuple[int, int, int, int]):
     xmin, ymin, xmax, ymax = box
     draw.rectangle([xmin, ymin, xmax, ymax], outline="red", width=2)
     return image
+
+
+def draw_bounding_boxes(image: Image.Image, boxes: list[tuple[int, int, int, int]]):
+    for box in boxes:
+        draw_bounding_box(image, box)
+    return image
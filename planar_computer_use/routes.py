@@ -1,17 +1,38 @@
 import asyncio
+from contextlib import asynccontextmanager
 import os
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Request, Query
+from fastapi import APIRouter, Request, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, StreamingResponse
 from planar.logging import get_logger
 from pydantic import BaseModel
-from .vnc_manager import VNCManager  # Changed import
+from .broadcast import StreamVariant, VNCDisconnected, frame_hub
+from .encoding import STREAM_FORMATS, image_encoder
+from .element_memory import element_memory
+from .grounding import (
+    backend_stats,
+    grounding_cache,
+    grounding_scheduler,
+    osatlas_client,
+)
+from .tiles import TILE_SIZE
+from .vnc_manager import vnc_pool
 
 # Configure logging
 logger = get_logger(__name__)
 
 
-router = APIRouter()
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Close pooled VNC sockets, HTTP connections and encoder workers, also on reload.
+    await vnc_pool.close_all()
+    await osatlas_client.aclose()
+    image_encoder.shutdown()
+
+
+router = APIRouter(lifespan=lifespan)
 pkg_dir = os.path.dirname(os.path.abspath(__file__))
 
 
@@ -29,6 +50,22 @@ async def get_index():
     return index_page
 
 
+@router.get("/api/metrics")
+async def get_metrics():
+    return {
+        "image_encoder": image_encoder.stats(),
+        "vnc_pool": vnc_pool.stats(),
+        "frame_hub": frame_hub.stats(),
+        "grounding": {
+            "client": osatlas_client.stats(),
+            "cache": grounding_cache.stats(),
+            "scheduler": grounding_scheduler.stats(),
+            "element_memory": element_memory.stats(),
+            "backends": {name: stats.stats() for name, stats in backend_stats.items()},
+        },
+    }
+
+
 @router.get("/api/vnc/stream")
 async def stream_vnc(
     request: Request,
@@ -38,37 +75,45 @@ async def stream_vnc(
     password: str = Query(
         "123456", description="VNC server password"
     ),  # Added password
+    width: Optional[int] = Query(
+        None, gt=0, description="Downscale frames to fit this width"
+    ),
+    height: Optional[int] = Query(
+        None, gt=0, description="Downscale frames to fit this height"
+    ),
+    format: Literal["png", "jpeg", "webp"] = Query(
+        "png", description="Image format of the data URLs"
+    ),
+    quality: int = Query(75, ge=1, le=100, description="JPEG/WebP quality"),
 ):
+    """
+    Streams frames as data URLs over SSE.
+
+    Defaults to full-resolution lossless PNG; dashboards showing thumbnails can ask
+    for a smaller size and a lossy format. Viewers asking for the same variant
+    share its encoding work.
+    """
+    variant = StreamVariant("data_url", format, quality, width=width, height=height)
+
     async def event_generator():
         logger.info(f"Attempting to start VNC stream for {host_port}")
         try:
-            async with VNCManager.connect(host_port, password) as manager:
-                logger.info(f"Successfully connected to {host_port} for streaming.")
-                last_screenshot_sent = None
+            async with frame_hub.subscribe(host_port, password, variant) as subscriber:
+                logger.info(f"Subscribed to {host_port} for streaming.")
                 while True:
                     if await request.is_disconnected():
                         logger.info(
                             f"Client disconnected from SSE stream for {host_port}."
                         )
                         break
-
-                    if manager.is_connected:
-                        screenshot_data = manager.last_screenshot_base64
-                        if screenshot_data != last_screenshot_sent:
-                            last_screenshot_sent = screenshot_data
-                            yield f"data: {screenshot_data}\n\n"
-                    else:
-                        # This state should ideally be handled by the VNCManager context exiting
-                        logger.warning(
-                            f"VNC manager for {host_port} reported not connected during stream."
-                        )
-                        yield "data: data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs=\n\n"
-                        yield f'event: status\ndata: {{"connected": false, "message": "VNC not connected to {host_port}."}}\n\n'
-                        break  # Stop streaming if connection lost
-
-                    await asyncio.sleep(
-                        0.1
-                    )  # Interval for checking for new screenshots
+                    screenshot_data = await subscriber.get()
+                    yield f"data: {screenshot_data}\n\n"
+        except VNCDisconnected:
+            logger.warning(
+                f"VNC manager for {host_port} reported not connected during stream."
+            )
+            yield "data: data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs=\n\n"
+            yield f'event: status\ndata: {{"connected": false, "message": "VNC not connected to {host_port}."}}\n\n'
         except ConnectionError as ce:
             logger.error(
                 f"ConnectionError for VNC stream {host_port}: {ce}", exc_info=True
@@ -83,3 +128,126 @@ async def stream_vnc(
             logger.info(f"SSE stream generator for {host_port} finished.")
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+@router.websocket("/api/vnc/ws")
+async def stream_vnc_ws(
+    websocket: WebSocket,
+    host_port: str = Query(
+        "127.0.0.1:5901", description="VNC server address as host:port"
+    ),
+    password: str = Query("123456", description="VNC server password"),
+    format: Literal["jpeg", "webp", "png"] = Query(
+        "jpeg", description="Image format of the binary frames"
+    ),
+    quality: int = Query(75, ge=1, le=100, description="JPEG/WebP quality"),
+    max_in_flight: int = Query(
+        2, ge=1, le=10, description="Frames sent before waiting for an ack"
+    ),
+    mode: Literal["frame", "tiles"] = Query(
+        "frame",
+        description="Send whole frames, or only changed tiles (see tiles.py for the layout)",
+    ),
+    keyframe_interval: float = Query(
+        10, gt=0, description="Seconds between full-screen resync frames in tiles mode"
+    ),
+    width: Optional[int] = Query(
+        None, gt=0, description="Downscale frames to fit this width"
+    ),
+    height: Optional[int] = Query(
+        None, gt=0, description="Downscale frames to fit this height"
+    ),
+):
+    """
+    Streams frames as binary WebSocket messages.
+
+    In "frame" mode each message is one encoded image. In "tiles" mode each
+    message carries only the tiles that changed since the previous message,
+    plus a periodic full-screen keyframe for resync.
+
+    Viewers asking for the same desktop and variant share one broadcaster, so
+    each frame is encoded once. The client acknowledges every rendered frame with
+    an "ack" text message. At most `max_in_flight` frames are unacknowledged at a
+    time; frames produced while the client is behind are dropped, so a slow link
+    always gets the latest frame instead of a growing backlog.
+    """
+    await websocket.accept()
+    logger.info(f"Attempting to start VNC WebSocket stream for {host_port}")
+    _, mime_type = STREAM_FORMATS[format]
+    variant = StreamVariant(mode, format, quality, keyframe_interval, width, height)
+    credits = max_in_flight
+    acked = asyncio.Event()
+
+    async def receive_acks():
+        nonlocal credits
+        while True:
+            message = await websocket.receive_text()
+            if message == "ack":
+                credits = min(credits + 1, max_in_flight)
+                acked.set()
+
+    async def until_disconnect(awaitable):
+        """Awaits `awaitable`, raising WebSocketDisconnect if the client leaves first."""
+        task = asyncio.ensure_future(awaitable)
+        await asyncio.wait([receiver, task], return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            receiver.result()  # Raises the disconnect
+            raise WebSocketDisconnect()
+        return task.result()
+
+    receiver = asyncio.create_task(receive_acks())
+    try:
+        async with frame_hub.subscribe(host_port, password, variant) as subscriber:
+            logger.info(f"Subscribed to {host_port} for WebSocket streaming.")
+            await websocket.send_json(
+                {
+                    "event": "status",
+                    "connected": True,
+                    "mime_type": mime_type,
+                    "mode": mode,
+                    "tile_size": TILE_SIZE,
+                }
+            )
+            while True:
+                if credits == 0:
+                    acked.clear()
+                    await until_disconnect(acked.wait())
+                    continue
+                message = await until_disconnect(subscriber.get())
+                await websocket.send_bytes(message)
+                credits -= 1
+    except WebSocketDisconnect:
+        logger.info(f"Client disconnected from WebSocket stream for {host_port}.")
+    except VNCDisconnected:
+        logger.warning(
+            f"VNC manager for {host_port} reported not connected during stream."
+        )
+        await _send_ws_error(
+            websocket,
+            f"VNC not connected to {host_port}.",
+            event={"event": "status", "connected": False},
+        )
+    except ConnectionError as ce:
+        logger.error(
+            f"ConnectionError for VNC WebSocket stream {host_port}: {ce}", exc_info=True
+        )
+        await _send_ws_error(
+            websocket, f"VNC Connection Error for {host_port}: {str(ce)}"
+        )
+    except Exception as e:
+        logger.error(f"Error in WebSocket stream for {host_port}: {e}", exc_info=True)
+        await _send_ws_error(websocket, f"Stream error for {host_port}: {str(e)}")
+    finally:
+        receiver.cancel()
+        logger.info(f"WebSocket stream for {host_port} finished.")
+
+
+async def _send_ws_error(
+    websocket: WebSocket, message: str, event: Optional[dict] = None
+):
+    try:
+        await websocket.send_json({**(event or {"event": "error"}), "message": message})
+        await websocket.close(code=1011)
+    except Exception:
+        pass  # The client is already gone
@@ -0,0 +1,167 @@
+import asyncio
+from collections import Counter
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Lower values run first.
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class _Flight:
+    """The priority a job waits at, and its queue ticket while it waits."""
+
+    __slots__ = ("priority", "ticket")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.ticket: Optional[asyncio.Future] = None
+
+
+class PriorityScheduler:
+    """
+    Runs jobs under a global concurrency budget, highest priority first.
+
+    Jobs submitted with the same key while one is already queued or running
+    are merged into it (single flight): the work runs once and every caller
+    gets its result, and a waiting job takes the best priority of its callers.
+    Waiting jobs are granted free slots in priority order, FIFO within a
+    priority.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._active = 0
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._flights: dict[Hashable, tuple[asyncio.Future, _Flight]] = {}
+        self._waiters: Counter[asyncio.Future] = Counter()
+        self._queued_by_priority: Counter[int] = Counter()
+        self._submitted = 0
+        self._coalesced = 0
+        self._promoted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        priority: int = BACKGROUND,
+    ) -> T:
+        """Runs `fn()` once a slot is free, or joins the job already running for `key`."""
+        entry = self._flights.get(key)
+        if entry is None:
+            self._submitted += 1
+            flight = _Flight(priority)
+            future = asyncio.ensure_future(self._run(fn, flight))
+            self._flights[key] = future, flight
+            future.add_done_callback(lambda _: self._forget(key, future))
+        else:
+            self._coalesced += 1
+            future, flight = entry
+            self._promote(flight, priority)
+        # Shielded so one cancelled caller does not cancel the job for the others;
+        # it is only cancelled once nobody is waiting for it anymore.
+        self._waiters[future] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1:
+                future.cancel()
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        entry = self._flights.get(key)
+        if entry is not None and entry[0] is future:
+            del self._flights[key]
+
+    def _promote(self, flight: _Flight, priority: int):
+        """Moves a job a better-priority caller joined ahead in the queue."""
+        if priority >= flight.priority:
+            return
+        ticket = flight.ticket
+        if ticket is not None and not ticket.done():
+            # The old entry stays behind; _release skips it once the ticket is granted.
+            heapq.heappush(self._queue, (priority, next(self._counter), ticket))
+            self._queued_by_priority[flight.priority] -= 1
+            self._queued_by_priority[priority] += 1
+            self._promoted += 1
+        flight.priority = priority
+
+    async def _run(self, fn: Callable[[], Awaitable[T]], flight: _Flight) -> T:
+        await self._acquire(flight)
+        try:
+            result = await fn()
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._release()
+
+    async def _acquire(self, flight: _Flight):
+        # Drop entries of granted, promoted or cancelled tickets at the head.
+        while self._queue and self._queue[0][2].done():
+            heapq.heappop(self._queue)
+        if self._active < self.max_concurrency and not self._queue:
+            self._active += 1
+            return
+
+        started = time.monotonic()
+        ticket = asyncio.get_running_loop().create_future()
+        flight.ticket = ticket
+        heapq.heappush(self._queue, (flight.priority, next(self._counter), ticket))
+        self._queued_by_priority[flight.priority] += 1
+        try:
+            await ticket
+        except asyncio.CancelledError:
+            if ticket.done() and not ticket.cancelled():
+                self._release()  # Granted a slot just before being cancelled
+            raise
+        finally:
+            flight.ticket = None
+            self._queued_by_priority[flight.priority] -= 1
+            waited = time.monotonic() - started
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+    def _release(self):
+        # Hand the slot straight to the best waiter, skipping cancelled ones.
+        while self._queue:
+            _, _, ticket = heapq.heappop(self._queue)
+            if not ticket.done():
+                ticket.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> dict[str, Any]:
+        finished = self._completed + self._failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": sum(self._queued_by_priority.values()),
+            "queued_by_priority": {
+                str(priority): count
+                for priority, count in sorted(self._queued_by_priority.items())
+                if count
+            },
+            "submitted": self._submitted,
+            "coalesced": self._coalesced,
+            "promoted": self._promoted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_wait_seconds": self._total_wait / finished if finished else 0.0,
+            "max_wait_seconds": self._max_wait,
+        }
@@ -0,0 +1,106 @@
+import struct
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from planar_computer_use.encoding import encode_stream_frame
+from planar_computer_use.framebuffer import Rect
+
+TILE_SIZE = 64
+# Above this fraction of changed pixels a single full-screen image is cheaper than tiles.
+KEYFRAME_AREA_RATIO = 0.5
+
+# Binary tile update layout (big endian):
+#   header: kind (u8), screen width (u16), screen height (u16), tile count (u16)
+#   per tile: x, y, width, height (u16 each), image length (u32), image bytes
+KEYFRAME = 0
+DELTA = 1
+UPDATE_HEADER = struct.Struct(">BHHH")
+TILE_HEADER = struct.Struct(">HHHHI")
+
+
+def changed_tiles(
+    previous: Optional[np.ndarray], current: np.ndarray, tile_size: int = TILE_SIZE
+) -> list[Rect]:
+    """
+    Returns the tiles whose pixels differ between two frames.
+
+    Changed tiles that are adjacent within a row are merged into one rectangle,
+    so a changed line of text costs one image instead of one per tile.
+    """
+    height, width = current.shape[:2]
+    if previous is None or previous.shape != current.shape:
+        return [(0, 0, width, height)]
+
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    diff = np.any(previous != current, axis=2)
+    diff = np.pad(diff, ((0, rows * tile_size - height), (0, cols * tile_size - width)))
+    changed = diff.reshape(rows, tile_size, cols, tile_size).any(axis=(1, 3))
+
+    rects = []
+    for row, col_start, col_end in _row_runs(changed):
+        x = col_start * tile_size
+        y = row * tile_size
+        rects.append(
+            (
+                x,
+                y,
+                min(col_end * tile_size, width) - x,
+                min(tile_size, height - y),
+            )
+        )
+    return rects
+
+
+def _row_runs(changed: np.ndarray) -> list[tuple[int, int, int]]:
+    runs = []
+    for row in np.flatnonzero(changed.any(axis=1)):
+        # Boundaries of consecutive True values in this row
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], changed[row], [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            runs.append((int(row), int(start), int(end)))
+    return runs
+
+
+def encode_tile_update(
+    pixels: np.ndarray, rects: list[Rect], kind: int, format: str, quality: int
+) -> bytes:
+    """Crops and encodes every rect of `pixels` into a single binary tile update message."""
+    height, width = pixels.shape[:2]
+    parts = [UPDATE_HEADER.pack(kind, width, height, len(rects))]
+    for x, y, tile_width, tile_height in rects:
+        tile = Image.fromarray(pixels[y : y + tile_height, x : x + tile_width], "RGB")
+        data = encode_stream_frame(tile, format, quality)
+        parts.append(TILE_HEADER.pack(x, y, tile_width, tile_height, len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def build_tile_update(
+    previous: Optional[np.ndarray],
+    current: np.ndarray,
+    format: str,
+    quality: int,
+    keyframe: bool = False,
+    tile_size: int = TILE_SIZE,
+) -> Optional[bytes]:
+    """
+    Builds the message bringing a client from `previous` to `current`, or None if nothing changed.
+
+    Sends a keyframe when asked to, when there is no previous frame, or when most
+    of the screen changed anyway.
+    """
+    height, width = current.shape[:2]
+    full_screen = [(0, 0, width, height)]
+    if keyframe or previous is None:
+        return encode_tile_update(current, full_screen, KEYFRAME, format, quality)
+
+    rects = changed_tiles(previous, current, tile_size)
+    if not rects:
+        return None
+    changed_area = sum(w * h for _, _, w, h in rects)
+    if changed_area > KEYFRAME_AREA_RATIO * width * height:
+        return encode_tile_update(current, full_screen, KEYFRAME, format, quality)
+    return encode_tile_update(current, rects, DELTA, format, quality)
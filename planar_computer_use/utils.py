@@ -1,21 +1,19 @@
-import io
 from PIL import Image
 from planar.utils import utc_now
 
 from planar.files.models import PlanarFile
 
+from planar_computer_use.encoding import image_encoder
 from planar_computer_use.vnc_manager import VNCManager
 
 
-def image_bytes(image: Image.Image) -> bytes:
-    buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    return buffered.getvalue()
+async def image_bytes(image: Image.Image) -> bytes:
+    return await image_encoder.encode(image, "PNG")
 
 
 async def upload_screenshot(screenshot_pil: Image.Image) -> PlanarFile:
     return await PlanarFile.upload(
-        content=image_bytes(screenshot_pil),
+        content=await image_bytes(screenshot_pil),
         content_type="image/png",
         filename=f"desktop-screenshot-{str(utc_now()).replace(' ', '-')}.png",
     )
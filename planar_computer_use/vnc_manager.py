@@ -1,34 +1,157 @@
 import asyncio
-import base64
-from contextvars import ContextVar, Token
-import io
-from typing import Optional
+from contextvars import ContextVar
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Hashable, Optional, TypeVar
 from contextlib import AsyncExitStack, asynccontextmanager
 
-from PIL import Image
+import numpy as np
 from planar.logging import get_logger
 import asyncvnc
 
+from planar_computer_use.encoding import (
+    encode_pixels,
+    fit_size,
+    image_encoder,
+    resize_pixels,
+)
+from planar_computer_use.framebuffer import Framebuffer, Rect, pixels_changed
+
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# How long an unused pooled connection is kept open before it is closed.
+VNC_POOL_IDLE_TTL = float(os.getenv("VNC_POOL_IDLE_TTL", "30"))
+# How long to wait for the initial full framebuffer update after connecting.
+FIRST_FRAME_TIMEOUT = 10
+# How long a capture right after input waits for the server to send the
+# screen as changed by it; an input that changes nothing gets no update.
+FRESH_FRAME_TIMEOUT = float(os.getenv("VNC_FRESH_FRAME_TIMEOUT", "0.5"))
+# Default adaptive capture rate bounds, see AdaptiveCaptureRate.
+VNC_CAPTURE_MAX_FPS = float(os.getenv("VNC_CAPTURE_MAX_FPS", "10"))
+VNC_CAPTURE_IDLE_FPS = float(os.getenv("VNC_CAPTURE_IDLE_FPS", "0.5"))
+
+# RFB server-to-client message types. asyncvnc.UpdateType numbers bell and
+# cut text differently from the protocol and lacks colour maps.
+FRAMEBUFFER_UPDATE = 0
+SET_COLOUR_MAP_ENTRIES = 1
+BELL = 2
+SERVER_CUT_TEXT = 3
+
 vnc_instance_cv: ContextVar[Optional["VNCManager"]] = ContextVar(
     "vnc_instance_cv", default=None
 )
 
 
+def parse_host_port(host_port_str: str) -> tuple[str, int]:
+    try:
+        host, port_str = host_port_str.split(":")
+        return host, int(port_str)
+    except ValueError:
+        raise ValueError(
+            f"Invalid host:port format: {host_port_str}. Expected 'host:port'."
+        )
+
+
+class AdaptiveCaptureRate:
+    """
+    Capture interval that jumps to `max_fps` on activity and decays back to `idle_fps`.
+
+    Input (clicks, keys) keeps the rate at `max_fps` for `input_boost_seconds`, a
+    detected screen change for `change_boost_seconds`. Afterwards the interval
+    doubles every `backoff_seconds` until it reaches the idle interval.
+    """
+
+    def __init__(
+        self,
+        max_fps: float = VNC_CAPTURE_MAX_FPS,
+        idle_fps: float = VNC_CAPTURE_IDLE_FPS,
+        input_boost_seconds: float = 2.0,
+        change_boost_seconds: float = 0.5,
+        backoff_seconds: float = 1.0,
+    ):
+        if max_fps <= 0 or idle_fps <= 0 or idle_fps > max_fps:
+            raise ValueError("Capture rates must satisfy 0 < idle_fps <= max_fps.")
+        self.max_fps = max_fps
+        self.idle_fps = idle_fps
+        self.input_boost_seconds = input_boost_seconds
+        self.change_boost_seconds = change_boost_seconds
+        self.backoff_seconds = backoff_seconds
+        self._boost_until = time.monotonic() + input_boost_seconds
+        self._activity = asyncio.Event()
+
+    def _boost(self, seconds: float):
+        self._boost_until = max(self._boost_until, time.monotonic() + seconds)
+        # Wake up loops currently sleeping on a long idle interval.
+        self._activity.set()
+        self._activity = asyncio.Event()
+
+    def notify_input(self):
+        self._boost(self.input_boost_seconds)
+
+    def notify_change(self):
+        self._boost(self.change_boost_seconds)
+
+    @property
+    def interval(self) -> float:
+        min_interval = 1 / self.max_fps
+        idle_for = time.monotonic() - self._boost_until
+        if idle_for <= 0:
+            return min_interval
+        return min(
+            min_interval * 2 ** (idle_for / self.backoff_seconds), 1 / self.idle_fps
+        )
+
+    @property
+    def current_fps(self) -> float:
+        return 1 / self.interval
+
+    async def wait(self):
+        """Sleeps for the current interval, returning early if activity is reported."""
+        activity = self._activity
+        try:
+            await asyncio.wait_for(activity.wait(), self.interval)
+        except TimeoutError:
+            pass
+
+
 class VNCManager:
-    def __init__(self, host: str, port: int, password: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        capture_rate: Optional[AdaptiveCaptureRate] = None,
+    ):
         self.host = host
         self.port = port
         self.password = password
         self.client: Optional[asyncvnc.Client] = None
         self.is_connected = False
-        self.last_screenshot_base64 = "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="  # Transparent pixel
-        self._screenshot_interval = 1
+        self.capture_rate = capture_rate or AdaptiveCaptureRate()
         self._update_task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         self._exit_stack: Optional[AsyncExitStack] = None
-        self._cm_token: Optional[Token] = None
+        # Only the reader task consumes server messages; everyone else reads the framebuffer.
+        self.framebuffer: Optional[Framebuffer] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._first_frame = asyncio.Event()
+        self._framebuffer_updated = asyncio.Event()
+        # Replaced every time an update is applied, for captures waiting on the next one.
+        self._update_applied = asyncio.Event()
+        self._synced_at = 0.0
+        self._last_input_at = 0.0
+        self._frame_condition = asyncio.Condition()
+        # Bumped every time the updater publishes a frame whose pixels differ from the last one.
+        self.frame_version = 0
+        self._published_pixels: Optional[np.ndarray] = None
+        self._published_sequence = -1
+        # Scaled/encoded variants of the current frame, shared by every consumer.
+        self._variant_version = 0
+        self._variant_cache: dict[Hashable, asyncio.Future] = {}
+        self.variant_cache_hits = 0
+        self.variant_cache_misses = 0
 
     @classmethod
     def get(cls) -> Optional["VNCManager"]:
@@ -37,123 +160,259 @@ class VNCManager:
 
     @classmethod
     @asynccontextmanager
-    async def connect(cls, host_port_str: str, password: str):
-        try:
-            host, port_str = host_port_str.split(":")
-            port = int(port_str)
-        except ValueError:
-            raise ValueError(
-                f"Invalid host:port format: {host_port_str}. Expected 'host:port'."
-            )
-
-        manager = cls(host, port, password)
-
-        original_token = vnc_instance_cv.set(manager)
-        manager._cm_token = original_token
+    async def connect(
+        cls,
+        host_port_str: str,
+        password: str,
+        capture_rate: Optional[AdaptiveCaptureRate] = None,
+    ) -> AsyncIterator["VNCManager"]:
+        """
+        Leases the pooled connection for `host_port_str` and exposes it via the context variable.
+
+        `capture_rate` paces the shared connection while this lease holds it; it
+        is refused if the connection is already leased with another rate.
+        """
+        host, port = parse_host_port(host_port_str)
+
+        async with vnc_pool.lease(host, port, password, capture_rate) as manager:
+            token = vnc_instance_cv.set(manager)
+            try:
+                yield manager
+            finally:
+                vnc_instance_cv.reset(token)
 
+    async def _open(self):
         try:
-            logger.info(
-                f"Attempting to connect to VNC server: {manager.host}:{manager.port}"
-            )
-            manager._exit_stack = AsyncExitStack()
-            manager.client = await manager._exit_stack.enter_async_context(
-                asyncvnc.connect(manager.host, manager.port, password=manager.password)
+            logger.info(f"Attempting to connect to VNC server: {self.host}:{self.port}")
+            self._exit_stack = AsyncExitStack()
+            self.client = await self._exit_stack.enter_async_context(
+                asyncvnc.connect(self.host, self.port, password=self.password)
             )
-            manager.is_connected = True
-            logger.info(f"Successfully connected to VNC: {manager.host}:{manager.port}")
-            logger.info(f"Server info: {manager.client}")
+            self.is_connected = True
+            logger.info(f"Successfully connected to VNC: {self.host}:{self.port}")
+            logger.info(f"Server info: {self.client}")
 
-            manager._stop_event.clear()
-            manager._update_task = asyncio.create_task(
-                manager._periodic_screenshot_updater()
+            self.framebuffer = Framebuffer(
+                self.client.video.width, self.client.video.height
             )
+            self._first_frame.clear()
+            self._framebuffer_updated.clear()
+            self._reader_task = asyncio.create_task(self._framebuffer_reader())
 
-            yield manager
+            self._stop_event.clear()
+            self._update_task = asyncio.create_task(self._periodic_screenshot_updater())
         except Exception as e:
             logger.error(
-                f"VNC Connection failed for {manager.host}:{manager.port}: {e}",
+                f"VNC Connection failed for {self.host}:{self.port}: {e}",
                 exc_info=True,
             )
             # Ensure partial cleanup if connection fails mid-way
-            if manager._update_task and not manager._update_task.done():
-                manager._stop_event.set()
-                manager._update_task.cancel()
-                try:
-                    await manager._update_task
-                except asyncio.CancelledError:
-                    pass
-            if manager._exit_stack:
-                await manager._exit_stack.aclose()
-            manager.client = None
-            manager.is_connected = False
+            await self._close()
             raise  # Re-raise the exception after cleanup
-        finally:
-            logger.info(f"Disconnecting from VNC server: {manager.host}:{manager.port}")
-            if manager._update_task:
-                manager._stop_event.set()
-                if not manager._update_task.done():
-                    manager._update_task.cancel()
-                    try:
-                        await manager._update_task
-                    except asyncio.CancelledError:
-                        logger.info(
-                            f"Screenshot updater task cancelled for {manager.host}:{manager.port}."
-                        )
-                    except Exception as e_task:
-                        logger.error(
-                            f"Error stopping screenshot updater for {manager.host}:{manager.port}: {e_task}",
-                            exc_info=True,
-                        )
-                manager._update_task = None
-
-            if manager._exit_stack:
+
+    async def _close(self):
+        logger.info(f"Disconnecting from VNC server: {self.host}:{self.port}")
+        if self._update_task:
+            self._stop_event.set()
+            if not self._update_task.done():
+                self._update_task.cancel()
                 try:
-                    await manager._exit_stack.aclose()
-                except Exception as e_stack:
+                    await self._update_task
+                except asyncio.CancelledError:
+                    logger.info(
+                        f"Screenshot updater task cancelled for {self.host}:{self.port}."
+                    )
+                except Exception as e_task:
                     logger.error(
-                        f"Error closing VNC exit stack for {manager.host}:{manager.port}: {e_stack}",
+                        f"Error stopping screenshot updater for {self.host}:{self.port}: {e_task}",
                         exc_info=True,
                     )
-                manager._exit_stack = None
+            self._update_task = None
 
-            manager.client = None
-            manager.is_connected = False
-            manager.last_screenshot_base64 = (
-                "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="
-            )
+        if self._reader_task:
+            if not self._reader_task.done():
+                self._reader_task.cancel()
+                try:
+                    await self._reader_task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e_task:
+                    logger.error(
+                        f"Error stopping framebuffer reader for {self.host}:{self.port}: {e_task}",
+                        exc_info=True,
+                    )
+            self._reader_task = None
 
-            if manager._cm_token:
-                vnc_instance_cv.reset(manager._cm_token)
-                manager._cm_token = None
-            logger.info(
-                f"Disconnected and cleaned up for VNC server: {manager.host}:{manager.port}"
+        if self._exit_stack:
+            try:
+                await self._exit_stack.aclose()
+            except Exception as e_stack:
+                logger.error(
+                    f"Error closing VNC exit stack for {self.host}:{self.port}: {e_stack}",
+                    exc_info=True,
+                )
+            self._exit_stack = None
+
+        self.client = None
+        self.is_connected = False
+        await self._notify_frame_waiters()
+        logger.info(
+            f"Disconnected and cleaned up for VNC server: {self.host}:{self.port}"
+        )
+
+    def _request_framebuffer_update(self, incremental: bool):
+        assert self.client and self.framebuffer
+        self.client.writer.write(
+            b"\x03"
+            + incremental.to_bytes(1, "big")
+            + (0).to_bytes(2, "big")
+            + (0).to_bytes(2, "big")
+            + self.framebuffer.width.to_bytes(2, "big")
+            + self.framebuffer.height.to_bytes(2, "big")
+        )
+
+    async def _read_server_message(self) -> Optional[list[tuple[Rect, np.ndarray]]]:
+        """
+        Reads one server message, returning the RGB rectangles of a FramebufferUpdate.
+
+        asyncvnc's own reader discards rectangle positions, so the update is parsed
+        here to keep track of which regions changed. Other messages are consumed
+        and None is returned; an unknown message type raises ValueError, as the
+        rest of the stream can no longer be parsed.
+        """
+        assert self.client
+        reader = self.client.reader
+        video = self.client.video
+        message_type = await asyncvnc.read_int(reader, 1)
+
+        if message_type == SET_COLOUR_MAP_ENTRIES:
+            header = await reader.readexactly(5)  # padding, first colour, count
+            await reader.readexactly(6 * int.from_bytes(header[3:], "big"))
+            return None
+        if message_type == BELL:
+            return None
+        if message_type == SERVER_CUT_TEXT:
+            await reader.readexactly(3)  # padding
+            self.client.clipboard.text = await asyncvnc.read_text(reader, "latin-1")
+            return None
+        if message_type != FRAMEBUFFER_UPDATE:
+            raise ValueError(f"Unknown VNC server message type: {message_type}")
+
+        await reader.readexactly(1)  # padding
+        rgb_channels = [video.mode.index(channel) for channel in "rgb"]
+        updates = []
+        for _ in range(await asyncvnc.read_int(reader, 2)):
+            x = await asyncvnc.read_int(reader, 2)
+            y = await asyncvnc.read_int(reader, 2)
+            width = await asyncvnc.read_int(reader, 2)
+            height = await asyncvnc.read_int(reader, 2)
+            encoding = await asyncvnc.read_int(reader, 4)
+
+            if encoding == 0:  # Raw
+                data = await reader.readexactly(height * width * 4)
+            elif encoding == 6:  # ZLib
+                length = await asyncvnc.read_int(reader, 4)
+                data = video.decompress(await reader.readexactly(length))
+            else:
+                raise ValueError(f"Unsupported VNC rectangle encoding: {encoding}")
+
+            block = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+            updates.append(((x, y, width, height), block[:, :, rgb_channels]))
+        return updates
+
+    async def _framebuffer_reader(self):
+        assert self.client and self.framebuffer
+        try:
+            self._request_framebuffer_update(incremental=False)
+            await self.client.drain()
+            while True:
+                updates = await self._read_server_message()
+                if updates is None:
+                    continue
+                self.framebuffer.apply(updates)
+                self._synced_at = time.monotonic()
+                self._update_applied.set()
+                self._update_applied = asyncio.Event()
+                self._first_frame.set()
+                self._framebuffer_updated.set()
+                # The server only answers incremental requests once something changed,
+                # so a request is always kept outstanding, at most one per capture interval.
+                await self.capture_rate.wait()
+                self._request_framebuffer_update(incremental=True)
+                await self.client.drain()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Framebuffer reader failed for {self.host}:{self.port}: {e}",
+                exc_info=True,
             )
-
-    async def capture_screen_pil(self):
-        if not self.is_connected or not self.client:
+            self.is_connected = False  # Assume connection is lost
+            # Wake up anyone waiting for a frame
+            self._first_frame.set()
+            self._framebuffer_updated.set()
+            self._update_applied.set()
+            await self._notify_frame_waiters()
+
+    def changes_since(self, sequence: int) -> Optional[list[Rect]]:
+        """Rectangles changed after framebuffer `sequence`, or None if the whole screen should be assumed changed."""
+        if not self.framebuffer:
+            return None
+        return self.framebuffer.changes_since(sequence)
+
+    @property
+    def published_frame(self) -> tuple[int, Optional[np.ndarray]]:
+        """The latest published (frame_version, RGB pixels). The pixels must not be modified."""
+        return self.frame_version, self._published_pixels
+
+    @property
+    def frame_sequence(self) -> int:
+        return self.framebuffer.sequence if self.framebuffer else 0
+
+    def _notify_input(self):
+        self._last_input_at = time.monotonic()
+        self.capture_rate.notify_input()
+
+    async def refresh_framebuffer(self):
+        """
+        Brings the framebuffer up to date with input sent since its last update.
+
+        The reader only requests updates at the capture rate, so right after a
+        click or key press an update is requested now and awaited for up to
+        FRESH_FRAME_TIMEOUT seconds.
+        """
+        if not self.is_connected or not self.client or not self.framebuffer:
             raise ConnectionError("Not connected to VNC server.")
-        for _ in range(10):
+        try:
+            await asyncio.wait_for(self._first_frame.wait(), FIRST_FRAME_TIMEOUT)
+        except TimeoutError:
+            raise Exception("Timed out waiting for the first framebuffer update.")
+        if self._last_input_at > self._synced_at and self.is_connected:
+            applied = self._update_applied
+            self._request_framebuffer_update(incremental=True)
+            await self.client.drain()
             try:
-                pixels = await self.client.screenshot()
-                image = Image.fromarray(pixels)
-                return image
-            except Exception as e:
-                logger.error(f"Failed to capture screen: {e}")
-        raise Exception("Failed to capture screen after multiple attempts.")
+                await asyncio.wait_for(applied.wait(), FRESH_FRAME_TIMEOUT)
+            except TimeoutError:
+                self._synced_at = time.monotonic()  # Nothing changed on screen
+        if not self.is_connected:
+            raise ConnectionError("VNC connection lost while capturing the screen.")
+
+    async def capture_screen_pil(self):
+        await self.refresh_framebuffer()
+        assert self.framebuffer
+        return self.framebuffer.to_image()
 
     async def capture_screen(self) -> bytes:
         pil_image = await self.capture_screen_pil()
-        buffered = io.BytesIO()
-        pil_image.save(buffered, format="PNG")
-        return buffered.getvalue()
+        return await image_encoder.encode(pil_image, "PNG")
 
     async def capture_screen_base64(self) -> str:
         if not self.is_connected:
             return "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="  # Placeholder
         try:
-            image_bytes = await self.capture_screen()
-            img_str = base64.b64encode(image_bytes).decode("utf-8")
-            return f"data:image/png;base64,{img_str}"
+            pil_image = await self.capture_screen_pil()
+            return await image_encoder.encode_data_url(pil_image, "PNG")
         except Exception as e:
             logger.error(f"Error capturing screen to base64: {e}")
             return "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="  # Error placeholder
@@ -162,22 +421,21 @@ class VNCManager:
         logger.info("Screenshot updater task started.")
         try:
             while not self._stop_event.is_set():
+                # Sleep until the reader applies a FramebufferUpdate, so an idle
+                # desktop costs no wakeups at all.
+                await self._framebuffer_updated.wait()
+                self._framebuffer_updated.clear()
                 if self.is_connected and self.client:
                     try:
-                        new_screenshot = await self.capture_screen_base64()
-                        if new_screenshot:
-                            self.last_screenshot_base64 = new_screenshot
+                        await self._publish_if_changed()
                     except Exception as e:
                         logger.error(f"Periodic screenshot update failed: {e}")
                 else:
                     # This case should ideally not be hit if _stop_event is managed correctly
                     # with is_connected status.
-                    self.last_screenshot_base64 = (
-                        "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="
-                    )
                     break  # If not connected, stop trying to update.
 
-                await asyncio.sleep(self._screenshot_interval)
+                await self.capture_rate.wait()
 
         except asyncio.CancelledError:
             logger.info(
@@ -189,12 +447,116 @@ class VNCManager:
                 exc_info=True,
             )
             self.is_connected = False  # Assume connection is lost
-            self.last_screenshot_base64 = (
-                "data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs="
-            )
+            await self._notify_frame_waiters()
         finally:
             logger.info(f"Screenshot updater task stopped for {self.host}:{self.port}.")
 
+    async def _publish_if_changed(self):
+        """Publishes a snapshot of the framebuffer only if its pixels changed; variants are encoded on demand."""
+        framebuffer = self.framebuffer
+        if not framebuffer or not self._first_frame.is_set():
+            return
+        sequence = framebuffer.sequence
+        if sequence == self._published_sequence:
+            return  # No FramebufferUpdate since the last check
+
+        rects = framebuffer.changes_since(self._published_sequence)
+        self._published_sequence = sequence
+        if self._published_pixels is not None and not pixels_changed(
+            self._published_pixels, framebuffer.pixels, rects
+        ):
+            return  # The server re-sent identical pixels
+
+        self.capture_rate.notify_change()
+        self._published_pixels = framebuffer.snapshot()
+        self.frame_version += 1
+        await self._notify_frame_waiters()
+
+    async def _cached_variant(
+        self, version: int, key: Hashable, factory: Callable[[], Awaitable[T]]
+    ) -> T:
+        if version != self._variant_version:
+            if version < self._variant_version:
+                # A newer frame was published meanwhile, don't evict its variants.
+                return await factory()
+            self._variant_cache.clear()
+            self._variant_version = version
+
+        future = self._variant_cache.get(key)
+        if future is None or (
+            future.done() and (future.cancelled() or future.exception())
+        ):
+            self.variant_cache_misses += 1
+            future = asyncio.ensure_future(factory())
+            self._variant_cache[key] = future
+        else:
+            self.variant_cache_hits += 1
+        # Shielded so one cancelled consumer does not cancel the work for the others.
+        return await asyncio.shield(future)
+
+    async def frame_pixels(
+        self, width: Optional[int] = None, height: Optional[int] = None
+    ) -> tuple[int, np.ndarray]:
+        """The latest published frame, downscaled to fit `width` x `height` if given."""
+        version, pixels = self.published_frame
+        if pixels is None:
+            raise ConnectionError("No frame has been published yet.")
+        full_size = (pixels.shape[1], pixels.shape[0])
+        size = fit_size(full_size, width, height)
+        if size == full_size:
+            return version, pixels
+        scaled = await self._cached_variant(
+            version,
+            ("pixels", size),
+            lambda: image_encoder.run(resize_pixels, pixels, size),
+        )
+        return version, scaled
+
+    async def frame_variant(
+        self,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        format: str = "png",
+        quality: int = 75,
+    ) -> tuple[int, bytes]:
+        """
+        The latest frame encoded as `format`, downscaled to fit `width` x `height` if given.
+
+        Each (size, format, quality) variant is encoded at most once per frame.
+        Without arguments this is the full-resolution lossless PNG.
+        """
+        version, pixels = await self.frame_pixels(width, height)
+        data = await self._cached_variant(
+            version,
+            ("encoded", pixels.shape, format, quality),
+            lambda: image_encoder.run(encode_pixels, pixels, format, quality),
+        )
+        return version, data
+
+    async def _notify_frame_waiters(self):
+        async with self._frame_condition:
+            self._frame_condition.notify_all()
+
+    async def wait_for_frame(
+        self, after_version: int, timeout: Optional[float] = None
+    ) -> int:
+        """
+        Waits until a frame newer than `after_version` is published and returns its version.
+
+        Raises ConnectionError if the connection is lost first, and TimeoutError
+        after `timeout` seconds.
+        """
+        async with self._frame_condition:
+            await asyncio.wait_for(
+                self._frame_condition.wait_for(
+                    lambda: self.frame_version > after_version or not self.is_connected
+                ),
+                timeout,
+            )
+        if self.frame_version <= after_version:
+            raise ConnectionError("VNC connection lost while waiting for a frame.")
+        return self.frame_version
+
     async def mouse_move(self, x: int, y: int):
         if not self.is_connected or not self.client:
             raise ConnectionError("Not connected to VNC server.")
@@ -203,6 +565,7 @@ class VNCManager:
             self.client.mouse.move(x, y)
             # Ensure events are sent
             await self.client.drain()
+            self._notify_input()
         except Exception as e:
             logger.error(f"VNC mouse move failed: {e}")
             raise
@@ -226,6 +589,7 @@ class VNCManager:
 
             # Ensure events are sent
             await self.client.drain()
+            self._notify_input()
 
             logger.info(f"Clicked at ({x},{y}) with button {button}")
         except Exception as e:
@@ -250,6 +614,7 @@ class VNCManager:
 
             # Ensure keystrokes are sent
             await self.client.drain()
+            self._notify_input()
 
             logger.info(f"Pressed keys: {' + '.join(keys)}")
         except Exception as e:
@@ -266,6 +631,7 @@ class VNCManager:
 
                 # Ensure keystrokes are sent
                 await self.client.drain()
+                self._notify_input()
 
                 await self.press_keys(["Return"])  # This sends a key press for "Return"
 
@@ -273,3 +639,147 @@ class VNCManager:
         except Exception as e:
             logger.error(f"VNC type failed: {e}")
             raise
+
+
+class VNCConnectionPool:
+    """
+    Process-wide pool handing out leases on one live VNCManager per host:port.
+
+    Every lease holder shares the same asyncvnc connection and screenshot
+    updater. Once the last lease is released, the connection is kept warm for
+    `idle_ttl` seconds so that a following workflow step or viewer can reuse it.
+    """
+
+    def __init__(self, idle_ttl: float = VNC_POOL_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._managers: dict[tuple[str, int], VNCManager] = {}
+        self._lease_counts: dict[tuple[str, int], int] = {}
+        self._idle_tasks: dict[tuple[str, int], asyncio.Task] = {}
+        self._locks: dict[tuple[str, int], asyncio.Lock] = {}
+        # Connections paced by a capture rate passed with a lease.
+        self._leased_rates: set[tuple[str, int]] = set()
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        capture_rate: Optional[AdaptiveCaptureRate] = None,
+    ) -> AsyncIterator[VNCManager]:
+        key = (host, port)
+        manager = await self._acquire(key, password, capture_rate)
+        try:
+            yield manager
+        finally:
+            await self._release(key, manager)
+
+    async def _acquire(
+        self,
+        key: tuple[str, int],
+        password: str,
+        capture_rate: Optional[AdaptiveCaptureRate] = None,
+    ) -> VNCManager:
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            idle_task = self._idle_tasks.pop(key, None)
+            if idle_task:
+                idle_task.cancel()
+
+            manager = self._managers.get(key)
+            if manager and manager.password != password:
+                if self._lease_counts.get(key, 0) > 0:
+                    raise PermissionError(
+                        f"Password does not match the pooled VNC connection for {key[0]}:{key[1]}."
+                    )
+                # Nobody is using the idle connection, reconnect with the new credentials.
+                await self._discard(key)
+                manager = None
+            if manager and not manager.is_connected:
+                logger.warning(
+                    f"Pooled VNC connection for {key[0]}:{key[1]} was lost, reconnecting."
+                )
+                await self._discard(key)
+                manager = None
+
+            if manager and capture_rate and manager.capture_rate is not capture_rate:
+                if self._lease_counts.get(key, 0) > 0:
+                    raise ValueError(
+                        f"The pooled VNC connection for {key[0]}:{key[1]} is leased with another capture rate."
+                    )
+                # Nobody is using the idle connection, pace it for the new lease.
+                manager.capture_rate = capture_rate
+
+            if manager is None:
+                manager = VNCManager(key[0], key[1], password, capture_rate)
+                await manager._open()
+                self._managers[key] = manager
+                self._lease_counts[key] = 0
+            if capture_rate:
+                self._leased_rates.add(key)
+
+            self._lease_counts[key] += 1
+            logger.info(
+                f"Leased VNC connection {key[0]}:{key[1]} ({self._lease_counts[key]} active leases)."
+            )
+            return manager
+
+    async def _release(self, key: tuple[str, int], manager: VNCManager):
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if self._managers.get(key) is not manager:
+                # The connection was replaced or closed while this lease was held.
+                return
+            self._lease_counts[key] -= 1
+            if self._lease_counts[key] > 0:
+                return
+            if key in self._leased_rates:
+                # A rate passed with a lease only applies while the connection is leased.
+                self._leased_rates.discard(key)
+                manager.capture_rate = AdaptiveCaptureRate()
+            if not manager.is_connected or self.idle_ttl <= 0:
+                await self._discard(key)
+                return
+            logger.info(
+                f"VNC connection {key[0]}:{key[1]} is idle, keeping it warm for {self.idle_ttl}s."
+            )
+            self._idle_tasks[key] = asyncio.create_task(self._close_when_idle(key))
+
+    async def _close_when_idle(self, key: tuple[str, int]):
+        await asyncio.sleep(self.idle_ttl)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if self._idle_tasks.get(key) is not asyncio.current_task():
+                return
+            del self._idle_tasks[key]
+            if self._lease_counts.get(key, 0) == 0:
+                await self._discard(key)
+
+    async def _discard(self, key: tuple[str, int]):
+        manager = self._managers.pop(key, None)
+        self._lease_counts.pop(key, None)
+        self._leased_rates.discard(key)
+        if manager:
+            await manager._close()
+
+    async def close_all(self):
+        """Closes every pooled connection, regardless of active leases."""
+        for task in self._idle_tasks.values():
+            task.cancel()
+        self._idle_tasks.clear()
+        for key in list(self._managers):
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                await self._discard(key)
+
+    def stats(self) -> dict[str, dict[str, int | float | bool]]:
+        return {
+            f"{host}:{port}": {
+                "leases": self._lease_counts.get((host, port), 0),
+                "connected": manager.is_connected,
+                "capture_fps": manager.capture_rate.current_fps,
+                "frame_version": manager.frame_version,
+                "variant_cache_hits": manager.variant_cache_hits,
+                "variant_cache_misses": manager.variant_cache_misses,
+            }
+            for (host, port), manager in self._managers.items()
+        }
+
+
+vnc_pool = VNCConnectionPool()
@@ -10,8 +10,13 @@ from planar_computer_use.agents import (
     computer_use_orchestration_agent,
     computer_use_agent,
 )
-from planar_computer_use.grounding import query_element_bbox
-from planar_computer_use.pil_utilities import draw_bounding_box
+from planar_computer_use.grounding import (
+    grounding_priority,
+    query_element_bbox,
+    query_element_bboxes,
+)
+from planar_computer_use.pil_utilities import draw_bounding_box, draw_bounding_boxes
+from planar_computer_use.scheduler import INTERACTIVE
 from planar_computer_use.utils import image_bytes, take_screenshot
 from planar_computer_use.vnc_manager import VNCManager
 
@@ -55,7 +60,7 @@ async def draw_rectangle(element: str, grounding_agent: bool = False) -> PlanarF
 
     img = draw_bounding_box(screenshot_pil, target_rect)
     screenshot_file = await PlanarFile.upload(
-        content=image_bytes(img),
+        content=await image_bytes(img),
         content_type="image/png",
         filename=f"bounding-box-{str(utc_now()).replace(' ', '-')}.png",
     )
@@ -74,4 +79,44 @@ async def highlight_ui_element(
             raise ConnectionError(
                 f"Failed to connect to VNC server at {vnc_host_port} for highlighting."
             )
-        return await draw_rectangle(element, grounding_agent=grounding_agent)
+        # A user is waiting on this one, so it goes ahead of background tasks.
+        token = grounding_priority.set(INTERACTIVE)
+        try:
+            return await draw_rectangle(element, grounding_agent=grounding_agent)
+        finally:
+            grounding_priority.reset(token)
+
+
+@step()
+async def draw_rectangles(
+    elements: list[str], grounding_agent: bool = False
+) -> PlanarFile:
+    # All elements are grounded on the same screenshot
+    target_rects, screenshot_pil = await query_element_bboxes(elements, grounding_agent)
+
+    img = draw_bounding_boxes(screenshot_pil, target_rects)
+    screenshot_file = await PlanarFile.upload(
+        content=await image_bytes(img),
+        content_type="image/png",
+        filename=f"bounding-boxes-{str(utc_now()).replace(' ', '-')}.png",
+    )
+    return screenshot_file
+
+
+@workflow()
+async def highlight_ui_elements(
+    elements: list[str],
+    grounding_agent: bool = False,
+    vnc_host_port: str = "127.0.0.1:5901",
+    vnc_password: str = "123456",
+) -> PlanarFile:
+    async with VNCManager.connect(vnc_host_port, vnc_password) as vnc_manager:
+        if not vnc_manager.is_connected:
+            raise ConnectionError(
+                f"Failed to connect to VNC server at {vnc_host_port} for highlighting."
+            )
+        token = grounding_priority.set(INTERACTIVE)
+        try:
+            return await draw_rectangles(elements, grounding_agent=grounding_agent)
+        finally:
+            grounding_priority.reset(token)
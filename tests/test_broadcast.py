@@ -0,0 +1,86 @@
+import asyncio
+
+import numpy as np
+
+from planar_computer_use.broadcast import FrameBroadcaster, StreamVariant, Subscriber
+from planar_computer_use.tiles import KEYFRAME, UPDATE_HEADER
+
+
+class FakeManager:
+    """Serves the encoded whole frames FrameBroadcaster asks for, one per call."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def frame_variant(self, width, height, format, quality):
+        self.frames += 1
+        return self.frames, f"frame {self.frames}".encode()
+
+
+def broadcaster(kind: str, *subscribers: Subscriber) -> FrameBroadcaster:
+    broadcaster = FrameBroadcaster("localhost:5900", "", StreamVariant(kind))
+    broadcaster._manager = FakeManager()
+    for subscriber in subscribers:
+        subscriber.needs_keyframe = False  # As if it got the current keyframe already
+        broadcaster.subscribers.add(subscriber)
+    return broadcaster
+
+
+def screen(value: int = 0) -> np.ndarray:
+    pixels = np.zeros((128, 128, 3), dtype=np.uint8)
+    pixels[:10, :10] = value
+    return pixels
+
+
+def test_full_mailbox_drops_the_oldest_message():
+    async def main():
+        subscriber = Subscriber(maxsize=2)
+        for message in ("a", "b", "c"):
+            assert subscriber.push(message, droppable=True)
+
+        assert not subscriber.push("d", droppable=False)
+        assert [await subscriber.get(), await subscriber.get()] == ["b", "c"]
+        assert subscriber.dropped == 1
+
+    asyncio.run(main())
+
+
+def test_slow_viewer_gets_the_latest_frames_without_holding_back_others():
+    async def main():
+        slow, fast = Subscriber(), Subscriber()
+        frames = broadcaster("frame", slow, fast)
+        received = []
+        for _ in range(4):
+            await frames._publish(None, screen())
+            received.append(await fast.get())
+
+        assert received == [b"frame 1", b"frame 2", b"frame 3", b"frame 4"]
+        assert [await slow.get(), await slow.get()] == [b"frame 3", b"frame 4"]
+        assert frames.stats()["dropped"] == 2
+        assert frames.published == 4
+
+    asyncio.run(main())
+
+
+def test_slow_tile_viewer_is_resynchronized_with_a_keyframe():
+    async def main():
+        slow, fast = Subscriber(), Subscriber()
+        tiles = broadcaster("tiles", slow, fast)
+        previous = None
+        for value in range(1, 5):
+            pixels = screen(value)
+            await tiles._publish(previous, pixels)
+            previous = pixels
+            await fast.get()
+
+        # Tile deltas are never dropped one by one; the viewer waits for a keyframe
+        assert slow.needs_keyframe
+        assert not fast.needs_keyframe
+
+        slow.reset(await tiles._current_keyframe())
+        kind, _, _, tiles_count = UPDATE_HEADER.unpack_from(await slow.get())
+        assert (kind, tiles_count) == (KEYFRAME, 1)
+        assert slow.dropped == 2  # The keyframe and delta it never read
+        assert not slow.needs_keyframe
+
+    asyncio.run(main())
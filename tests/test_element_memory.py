@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from planar_computer_use.element_memory import (
+    ElementMemory,
+    downsample,
+    match_template,
+    ncc_map,
+    to_gray,
+)
+from planar_computer_use.grounding import GroundingCache, _backend_name, memory_key
+
+ICON_SIZE = 24
+
+
+def make_icon(seed: int = 0) -> np.ndarray:
+    """A textured RGB icon, so it only matches where it actually is."""
+    cells = np.random.default_rng(seed).integers(0, 256, (6, 6, 3), dtype=np.uint8)
+    return np.kron(cells, np.ones((4, 4, 1), dtype=np.uint8))
+
+
+def make_frame(*positions: tuple[int, int], icon: np.ndarray) -> np.ndarray:
+    frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+    for x, y in positions:
+        frame[y : y + ICON_SIZE, x : x + ICON_SIZE] = icon
+    return frame
+
+
+def bbox_at(x: int, y: int) -> tuple[int, int, int, int]:
+    return x, y, x + ICON_SIZE, y + ICON_SIZE
+
+
+def brute_force_ncc(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    height, width = template.shape
+    centered = template - template.mean()
+    scores = np.zeros((image.shape[0] - height + 1, image.shape[1] - width + 1))
+    for y in range(scores.shape[0]):
+        for x in range(scores.shape[1]):
+            window = image[y : y + height, x : x + width]
+            window = window - window.mean()
+            denominator = np.sqrt((window**2).sum() * (centered**2).sum())
+            scores[y, x] = (window * centered).sum() / denominator if denominator else 0
+    return scores
+
+
+def test_ncc_map_matches_brute_force():
+    rng = np.random.default_rng(0)
+    image = rng.uniform(0, 255, (40, 50))
+    template = image[10:22, 30:38].copy()
+
+    scores = ncc_map(image, template)
+
+    np.testing.assert_allclose(scores, brute_force_ncc(image, template), atol=1e-6)
+    assert np.unravel_index(np.argmax(scores), scores.shape) == (10, 30)
+
+
+def test_ncc_map_of_oversized_template_is_empty():
+    assert ncc_map(np.zeros((10, 10)), np.ones((12, 4))).size == 0
+
+
+def test_downsample_averages_blocks():
+    gray = np.arange(36, dtype=np.float32).reshape(6, 6)
+
+    assert downsample(gray, 4).tolist() == [[10.5]]
+    assert downsample(gray, 2)[0, 0] == (0 + 1 + 6 + 7) / 4
+
+
+def test_match_template_finds_scaled_icon():
+    icon = make_icon()
+    frame = make_frame((100, 80), icon=icon)
+    template = to_gray(frame[72:112, 92:132]).round().astype(np.uint8)
+    bigger = np.kron(icon, np.ones((5, 5, 1), dtype=np.uint8))[::4, ::4]  # 1.25x
+    frame = make_frame(icon=icon)
+    frame[200 : 200 + bigger.shape[0], 300 : 300 + bigger.shape[1]] = bigger
+
+    match = match_template(frame, template)
+
+    assert match is not None
+    assert match.scale == 1.25
+    assert match.score > 0.9
+    assert abs(match.x - (300 - 10)) <= 2 and abs(match.y - (200 - 10)) <= 2
+
+
+def test_finds_moved_element():
+    memory = ElementMemory()
+    icon = make_icon()
+    memory.remember("save", make_frame((100, 80), icon=icon), bbox_at(100, 80))
+
+    bbox = asyncio.run(memory.locate("save", make_frame((300, 200), icon=icon)))
+
+    assert bbox == bbox_at(300, 200)
+    assert memory.hits == 1
+
+
+def test_rejects_duplicates():
+    memory = ElementMemory()
+    icon = make_icon()
+    memory.remember("save", make_frame((100, 80), icon=icon), bbox_at(100, 80))
+
+    frame = make_frame((100, 80), (400, 300), icon=icon)
+    assert asyncio.run(memory.locate("save", frame)) is None
+    assert memory.ambiguous == 1
+
+
+def test_rejects_missing_element():
+    memory = ElementMemory()
+    memory.remember("save", make_frame((100, 80), icon=make_icon()), bbox_at(100, 80))
+
+    frame = make_frame((100, 80), icon=make_icon(seed=1))
+    assert asyncio.run(memory.locate("save", frame)) is None
+    assert memory.low_confidence == 1
+
+
+def test_keys_are_per_desktop_and_frame_size():
+    desktop = SimpleNamespace(host="localhost", port=5900)
+    other = SimpleNamespace(host="localhost", port=5901)
+    key = memory_key(desktop, " Save ", (480, 640, 3))
+
+    assert key == memory_key(desktop, "save", (480, 640, 4))
+    assert key != memory_key(other, "save", (480, 640, 3))
+    assert key != memory_key(desktop, "save", (768, 1024, 3))
+
+
+def test_invalidated_recalled_bbox_is_forgotten(monkeypatch):
+    from planar_computer_use import grounding
+
+    memory = ElementMemory()
+    monkeypatch.setattr(grounding, "element_memory", memory)
+    icon = make_icon()
+    frame = make_frame((100, 80), icon=icon)
+    desktop = SimpleNamespace(
+        host="localhost", port=5900, framebuffer=SimpleNamespace(pixels=frame)
+    )
+    key = memory_key(desktop, "save", frame.shape)
+    memory.remember(key, frame, bbox_at(100, 80))
+    backend = _backend_name(grounding_agent=False)
+    cache = GroundingCache()
+    cache.put(desktop, backend, "save", bbox_at(100, 80), frame, recalled=True)
+
+    desktop.framebuffer.pixels = make_frame((300, 200), icon=icon)
+
+    assert cache.get(desktop, backend, "save") is None
+    assert memory.forgotten == 1
+    assert asyncio.run(memory.locate(key, desktop.framebuffer.pixels)) is None
@@ -0,0 +1,40 @@
+import numpy as np
+
+from planar_computer_use.framebuffer import Framebuffer
+
+
+def block(width: int, height: int, value: int = 255) -> np.ndarray:
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_apply_writes_pixels_and_records_rects():
+    framebuffer = Framebuffer(8, 6)
+
+    assert framebuffer.apply([((2, 1, 3, 2), block(3, 2))]) == 1
+    assert (
+        framebuffer.apply([((0, 0, 1, 1), block(1, 1)), ((7, 5, 1, 1), block(1, 1))])
+        == 2
+    )
+
+    assert framebuffer.pixels[1:3, 2:5].min() == 255
+    assert framebuffer.pixels[3:, :7].max() == 0
+    assert framebuffer.changes_since(0) == [(2, 1, 3, 2), (0, 0, 1, 1), (7, 5, 1, 1)]
+    assert framebuffer.changes_since(1) == [(0, 0, 1, 1), (7, 5, 1, 1)]
+    assert framebuffer.changes_since(2) == []
+
+
+def test_unknown_sequence_means_everything_changed():
+    framebuffer = Framebuffer(8, 6)
+    framebuffer.apply([((0, 0, 1, 1), block(1, 1))])
+
+    assert framebuffer.changes_since(5) is None
+
+
+def test_history_overflow_means_everything_changed():
+    framebuffer = Framebuffer(8, 6, history=2)
+    for x in range(3):
+        framebuffer.apply([((x, 0, 1, 1), block(1, 1))])
+
+    # Sequence 1 is gone, so what changed right after 0 is unknown
+    assert framebuffer.changes_since(0) is None
+    assert framebuffer.changes_since(1) == [(1, 0, 1, 1), (2, 0, 1, 1)]
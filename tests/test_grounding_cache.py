@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from planar_computer_use.grounding import GroundingCache, _backend_name
+
+BBOX = (100, 100, 140, 120)
+OS_ATLAS = _backend_name(grounding_agent=False)
+
+
+def make_desktop(port: int = 5900) -> SimpleNamespace:
+    pixels = np.zeros((480, 640, 3), dtype=np.uint8)
+    return SimpleNamespace(
+        host="localhost", port=port, framebuffer=SimpleNamespace(pixels=pixels)
+    )
+
+
+def cached(desktop: SimpleNamespace, **kwargs) -> GroundingCache:
+    cache = GroundingCache(**kwargs)
+    cache.put(desktop, OS_ATLAS, "Save", BBOX, desktop.framebuffer.pixels.copy())
+    return cache
+
+
+def test_hit_on_unchanged_screen():
+    desktop = make_desktop()
+    cache = cached(desktop)
+
+    assert cache.get(desktop, OS_ATLAS, "  save ") == BBOX
+    assert cache.hits == 1
+
+
+def test_change_outside_the_region_keeps_the_entry():
+    desktop = make_desktop()
+    cache = cached(desktop, margin=32)
+    desktop.framebuffer.pixels[300:, 400:] = 255
+
+    assert cache.get(desktop, OS_ATLAS, "save") == BBOX
+
+
+def test_change_in_the_margin_invalidates_the_entry():
+    desktop = make_desktop()
+    cache = cached(desktop, margin=32)
+    desktop.framebuffer.pixels[80, 90] = 1  # Above and left of the bbox
+
+    assert cache.get(desktop, OS_ATLAS, "save") is None
+    assert cache.invalidations == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_resized_screen_invalidates_the_entry():
+    desktop = make_desktop()
+    cache = cached(desktop)
+    desktop.framebuffer.pixels = np.zeros((768, 1024, 3), dtype=np.uint8)
+
+    assert cache.get(desktop, OS_ATLAS, "save") is None
+    assert cache.invalidations == 1
+
+
+def test_expired_entry_is_dropped():
+    desktop = make_desktop()
+    cache = cached(desktop, ttl=-1)
+
+    assert cache.get(desktop, OS_ATLAS, "save") is None
+    assert cache.expirations == 1
+
+
+def test_entries_are_per_desktop_and_backend():
+    desktop = make_desktop()
+    cache = cached(desktop)
+
+    assert cache.get(make_desktop(port=5901), OS_ATLAS, "save") is None
+    assert cache.get(desktop, _backend_name(grounding_agent=True), "save") is None
+    assert cache.get(desktop, _backend_name(False, hedged=True), "save") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    desktop = make_desktop()
+    pixels = desktop.framebuffer.pixels
+    cache = GroundingCache(max_entries=2)
+    cache.put(desktop, OS_ATLAS, "a", BBOX, pixels)
+    cache.put(desktop, OS_ATLAS, "b", BBOX, pixels)
+    cache.get(desktop, OS_ATLAS, "a")
+    cache.put(desktop, OS_ATLAS, "c", BBOX, pixels)
+
+    assert cache.get(desktop, OS_ATLAS, "a") == BBOX
+    assert cache.get(desktop, OS_ATLAS, "b") is None
+    assert cache.get(desktop, OS_ATLAS, "c") == BBOX
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from planar_computer_use import grounding
+from planar_computer_use.grounding import BackendStats, _hedged_ground
+
+PRIMARY, SECONDARY = "os_atlas", "grounding_agent"
+
+
+class FakeBackends:
+    """Stands in for _ground: each backend answers its bbox, or raises, after a delay."""
+
+    def __init__(self, **behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, backend, element, screenshot_pil):
+        self.calls.append(backend)
+        delay, outcome = self.behaviours[backend]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(backend)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = {PRIMARY: BackendStats(), SECONDARY: BackendStats()}
+    monkeypatch.setattr(grounding, "backend_stats", stats)
+    monkeypatch.setattr(grounding, "GROUNDING_HEDGE_DEFAULT_DELAY", 0.02)
+    return stats
+
+
+def hedge(monkeypatch, **behaviours) -> FakeBackends:
+    backends = FakeBackends(**behaviours)
+    monkeypatch.setattr(grounding, "_ground", backends)
+    return backends
+
+
+def ground():
+    return asyncio.run(_hedged_ground(PRIMARY, SECONDARY, "Save", None))
+
+
+def test_fast_primary_is_not_hedged(monkeypatch, stats):
+    backends = hedge(
+        monkeypatch, os_atlas=(0, (1, 1, 2, 2)), grounding_agent=(0, (3, 3, 4, 4))
+    )
+
+    assert ground() == (1, 1, 2, 2)
+    assert backends.calls == [PRIMARY]
+    assert stats[PRIMARY].hedged_calls == 0
+
+
+def test_slow_primary_loses_to_the_secondary_and_is_cancelled(monkeypatch, stats):
+    backends = hedge(
+        monkeypatch, os_atlas=(5, (1, 1, 2, 2)), grounding_agent=(0, (3, 3, 4, 4))
+    )
+
+    assert ground() == (3, 3, 4, 4)
+    assert backends.calls == [PRIMARY, SECONDARY]
+    assert backends.cancelled == [PRIMARY]
+    assert (stats[PRIMARY].hedged_calls, stats[PRIMARY].wins) == (1, 0)
+    assert (stats[SECONDARY].hedged_calls, stats[SECONDARY].wins) == (1, 1)
+
+
+def test_slow_primary_can_still_win_the_race(monkeypatch, stats):
+    backends = hedge(
+        monkeypatch, os_atlas=(0.05, (1, 1, 2, 2)), grounding_agent=(5, (3, 3, 4, 4))
+    )
+
+    assert ground() == (1, 1, 2, 2)
+    assert backends.cancelled == [SECONDARY]
+    assert stats[PRIMARY].wins == 1
+    assert stats[SECONDARY].wins == 0
+
+
+def test_failed_primary_falls_back_to_the_secondary(monkeypatch, stats):
+    backends = hedge(
+        monkeypatch,
+        os_atlas=(0, ConnectionError("down")),
+        grounding_agent=(0, (3, 3, 4, 4)),
+    )
+
+    assert ground() == (3, 3, 4, 4)
+    assert backends.calls == [PRIMARY, SECONDARY]
+    assert stats[SECONDARY].wins == 1
+
+
+def test_error_is_raised_when_both_backends_fail(monkeypatch, stats):
+    backends = hedge(
+        monkeypatch,
+        os_atlas=(0.05, ConnectionError("down")),
+        grounding_agent=(0, ValueError("no box")),
+    )
+
+    with pytest.raises(ConnectionError):
+        ground()
+    assert backends.cancelled == []
+    assert stats[PRIMARY].wins == stats[SECONDARY].wins == 0
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+
+from planar_computer_use.scheduler import BACKGROUND, INTERACTIVE, PriorityScheduler
+
+
+def test_same_key_runs_once():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=2)
+        calls = 0
+
+        async def job():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(scheduler.run("key", job) for _ in range(3)))
+        assert results == ["done"] * 3
+        assert calls == 1
+        assert scheduler.stats()["coalesced"] == 2
+
+        # Finished jobs are not joined anymore.
+        assert await scheduler.run("key", job) == "done"
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_failure_reaches_every_caller():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=1)
+
+        async def job():
+            await asyncio.sleep(0.01)
+            raise ValueError("no bbox")
+
+        results = await asyncio.gather(
+            scheduler.run("key", job), scheduler.run("key", job), return_exceptions=True
+        )
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        assert scheduler.stats()["failed"] == 1
+
+    asyncio.run(main())
+
+
+def test_waiting_jobs_run_by_priority():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order = []
+
+        def job(name):
+            async def run():
+                if name == "blocker":
+                    await release.wait()
+                order.append(name)
+
+            return run
+
+        tasks = [asyncio.create_task(scheduler.run("blocker", job("blocker")))]
+        await asyncio.sleep(0.01)
+        for name, priority in [
+            ("background 1", BACKGROUND),
+            ("interactive 1", INTERACTIVE),
+            ("background 2", BACKGROUND),
+            ("interactive 2", INTERACTIVE),
+        ]:
+            tasks.append(asyncio.create_task(scheduler.run(name, job(name), priority)))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queued"] == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == [
+            "blocker",
+            "interactive 1",
+            "interactive 2",
+            "background 1",
+            "background 2",
+        ]
+
+    asyncio.run(main())
+
+
+def test_cancelling_one_caller_keeps_the_shared_job():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(scheduler.run("key", job))
+        second = asyncio.create_task(scheduler.run("key", job))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+
+
+def test_cancelling_every_caller_cancels_the_job_and_frees_its_slot():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        started = asyncio.Event()
+        cancelled = False
+
+        async def stuck():
+            nonlocal cancelled
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        async def queued():
+            return "unreachable"
+
+        async def job():
+            return "done"
+
+        running = asyncio.create_task(scheduler.run("stuck", stuck))
+        waiting = asyncio.create_task(scheduler.run("queued", queued))
+        await started.wait()
+        waiting.cancel()
+        running.cancel()
+        await asyncio.gather(running, waiting, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert cancelled
+        assert await asyncio.wait_for(scheduler.run("next", job), 1) == "done"
+        assert scheduler.stats()["active"] == 0
+        assert scheduler.stats()["queued"] == 0
+
+    asyncio.run(main())
+
+
+def test_joining_at_a_better_priority_promotes_the_job():
+    async def main():
+        scheduler = PriorityScheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order = []
+
+        def job(name):
+            async def run():
+                if name == "blocker":
+                    await release.wait()
+                order.append(name)
+                return name
+
+            return run
+
+        tasks = [asyncio.create_task(scheduler.run("blocker", job("blocker")))]
+        await asyncio.sleep(0.01)
+        for name in ("background 1", "shared", "background 2"):
+            tasks.append(
+                asyncio.create_task(scheduler.run(name, job(name), BACKGROUND))
+            )
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(
+            scheduler.run("shared", job("shared"), INTERACTIVE)
+        )
+        await asyncio.sleep(0.01)
+        stats = scheduler.stats()
+        assert stats["queued_by_priority"] == {
+            str(INTERACTIVE): 1,
+            str(BACKGROUND): 2,
+        }
+
+        release.set()
+        assert await interactive == "shared"
+        await asyncio.gather(*tasks)
+        assert order == ["blocker", "shared", "background 1", "background 2"]
+        assert scheduler.stats()["promoted"] == 1
+        assert scheduler.stats()["queued"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from planar_computer_use.tiles import (
+    DELTA,
+    KEYFRAME,
+    TILE_HEADER,
+    UPDATE_HEADER,
+    build_tile_update,
+    changed_tiles,
+)
+
+
+def frame(width: int = 256, height: int = 128) -> np.ndarray:
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def parse_update(message: bytes) -> tuple[int, int, int, list]:
+    """Splits a tile update into its header fields and (rect, RGB pixels) tiles."""
+    kind, width, height, count = UPDATE_HEADER.unpack_from(message)
+    offset = UPDATE_HEADER.size
+    tiles = []
+    for _ in range(count):
+        x, y, tile_width, tile_height, length = TILE_HEADER.unpack_from(message, offset)
+        offset += TILE_HEADER.size
+        image = Image.open(io.BytesIO(message[offset : offset + length]))
+        tiles.append(
+            ((x, y, tile_width, tile_height), np.asarray(image.convert("RGB")))
+        )
+        offset += length
+    assert offset == len(message)
+    return kind, width, height, tiles
+
+
+def test_no_previous_frame_or_new_size_is_the_whole_screen():
+    current = frame()
+
+    assert changed_tiles(None, current) == [(0, 0, 256, 128)]
+    assert changed_tiles(frame(128, 128), current) == [(0, 0, 256, 128)]
+    assert changed_tiles(current.copy(), current) == []
+
+
+def test_adjacent_changed_tiles_of_a_row_are_merged():
+    previous = frame()
+    current = previous.copy()
+    current[10, 10] = 1  # Tiles (0, 0)
+    current[20, 100] = 1  # and (0, 1) merge
+    current[0, 255] = 1  # (0, 3) is apart
+    current[127, 64] = 1  # (1, 1) is on the next row
+
+    assert changed_tiles(previous, current) == [
+        (0, 0, 128, 64),
+        (192, 0, 64, 64),
+        (64, 64, 64, 64),
+    ]
+
+
+def test_edge_tiles_are_clipped_to_the_screen():
+    previous = frame(150, 100)
+    current = previous.copy()
+    current[99, 149] = 1
+
+    assert changed_tiles(previous, current) == [(128, 64, 22, 36)]
+
+
+def test_delta_update_layout():
+    previous = frame()
+    current = previous.copy()
+    current[70:80, 130:140] = (10, 20, 30)
+
+    kind, width, height, tiles = parse_update(
+        build_tile_update(previous, current, "png", 75)
+    )
+
+    assert (kind, width, height) == (DELTA, 256, 128)
+    [((x, y, tile_width, tile_height), pixels)] = tiles
+    assert (x, y, tile_width, tile_height) == (128, 64, 64, 64)
+    assert np.array_equal(pixels, current[64:128, 128:192])
+
+
+def test_unchanged_frame_sends_nothing():
+    previous = frame()
+
+    assert build_tile_update(previous, previous.copy(), "png", 75) is None
+
+
+def test_keyframe_when_asked_without_previous_or_past_the_area_threshold():
+    previous = frame()
+    current = previous.copy()
+    current[:, :192] = 255  # Three quarters of the screen
+
+    for message in (
+        build_tile_update(previous, current, "png", 75),
+        build_tile_update(None, current, "png", 75),
+        build_tile_update(previous, previous.copy(), "png", 75, keyframe=True),
+    ):
+        kind, _, _, tiles = parse_update(message)
+        assert kind == KEYFRAME
+        assert [rect for rect, _ in tiles] == [(0, 0, 256, 128)]
+
+    # Half the screen or less stays a delta
+    current = previous.copy()
+    current[:, :128] = 255
+    kind, _, _, tiles = parse_update(build_tile_update(previous, current, "png", 75))
+    assert kind == DELTA
+    assert [rect for rect, _ in tiles] == [(0, 0, 128, 64), (0, 64, 128, 64)]
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from planar_computer_use import vnc_manager
+from planar_computer_use.framebuffer import Framebuffer
+from planar_computer_use.vnc_manager import (
+    AdaptiveCaptureRate,
+    VNCConnectionPool,
+    VNCManager,
+)
+
+
+def make_manager(*messages: bytes) -> VNCManager:
+    """A manager whose server sent `messages`; must be called in a running loop."""
+    reader = asyncio.StreamReader()
+    for message in messages:
+        reader.feed_data(message)
+    reader.feed_eof()
+    manager = VNCManager("localhost", 5900, "")
+    manager.client = SimpleNamespace(
+        reader=reader,
+        video=SimpleNamespace(mode="bgra"),
+        clipboard=SimpleNamespace(text=""),
+    )
+    return manager
+
+
+BELL = b"\x02"
+
+
+def cut_text(text: str) -> bytes:
+    data = text.encode("latin-1")
+    return b"\x03" + bytes(3) + len(data).to_bytes(4, "big") + data
+
+
+def colour_map(count: int) -> bytes:
+    return (
+        b"\x01"
+        + bytes(1)
+        + (0).to_bytes(2, "big")
+        + count.to_bytes(2, "big")
+        + bytes(6 * count)
+    )
+
+
+def raw_update(x: int, y: int, bgra: bytes) -> bytes:
+    rect = b"".join(value.to_bytes(2, "big") for value in (x, y, 1, 1))
+    return b"\x00" + bytes(1) + (1).to_bytes(2, "big") + rect + bytes(4) + bgra
+
+
+def test_bell_and_cut_text_keep_the_stream_in_sync():
+    async def main():
+        manager = make_manager(
+            BELL,
+            cut_text("copied é"),
+            colour_map(2),
+            raw_update(3, 4, b"\x01\x02\x03\x00"),
+        )
+
+        assert await manager._read_server_message() is None
+        assert await manager._read_server_message() is None
+        assert manager.client.clipboard.text == "copied é"
+        assert await manager._read_server_message() is None
+        [(rect, pixels)] = await manager._read_server_message()
+
+        assert rect == (3, 4, 1, 1)
+        assert pixels.tolist() == [[[3, 2, 1]]]  # RGB out of BGRA
+
+    asyncio.run(main())
+
+
+def test_unknown_message_type_is_an_error():
+    async def main():
+        manager = make_manager(b"\x7f")
+
+        with pytest.raises(ValueError):
+            await manager._read_server_message()
+
+    asyncio.run(main())
+
+
+class FakeWriter:
+    def __init__(self):
+        self.written = []
+
+    def write(self, data: bytes):
+        self.written.append(data)
+
+
+def connected_manager() -> VNCManager:
+    manager = VNCManager("localhost", 5900, "")
+    writer = FakeWriter()
+
+    async def drain():
+        pass
+
+    manager.client = SimpleNamespace(writer=writer, drain=drain)
+    manager.framebuffer = Framebuffer(4, 3)
+    manager.is_connected = True
+    manager._first_frame.set()
+    return manager
+
+
+def test_capture_after_input_waits_for_the_next_update():
+    async def main():
+        manager = connected_manager()
+        manager._notify_input()
+
+        refresh = asyncio.create_task(manager.refresh_framebuffer())
+        await asyncio.sleep(0.01)
+        assert not refresh.done()
+        # An incremental update request for the whole screen
+        assert manager.client.writer.written == [
+            b"\x03\x01" + bytes(4) + (4).to_bytes(2, "big") + (3).to_bytes(2, "big")
+        ]
+
+        manager.framebuffer.apply([((0, 0, 1, 1), np.zeros((1, 1, 3), np.uint8))])
+        manager._synced_at = time.monotonic()
+        manager._update_applied.set()
+        await asyncio.wait_for(refresh, 1)
+
+        # Up to date now, no further round trip
+        await manager.refresh_framebuffer()
+        assert len(manager.client.writer.written) == 1
+
+    asyncio.run(main())
+
+
+def test_capture_after_input_without_changes_waits_once(monkeypatch):
+    monkeypatch.setattr(vnc_manager, "FRESH_FRAME_TIMEOUT", 0.01)
+
+    async def main():
+        manager = connected_manager()
+        manager._notify_input()
+
+        await manager.refresh_framebuffer()
+        await manager.refresh_framebuffer()
+
+        assert len(manager.client.writer.written) == 1
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Replaces connecting and disconnecting with a record of opened and closed managers."""
+    record = SimpleNamespace(opened=[], closed=[])
+
+    async def open_(self):
+        self.is_connected = True
+        record.opened.append(self)
+
+    async def close(self):
+        self.is_connected = False
+        record.closed.append(self)
+
+    monkeypatch.setattr(VNCManager, "_open", open_)
+    monkeypatch.setattr(VNCManager, "_close", close)
+    return record
+
+
+def test_leases_share_one_connection_until_the_last_release(connections):
+    async def main():
+        pool = VNCConnectionPool(idle_ttl=0)
+        async with pool.lease("localhost", 5900, "secret") as first:
+            async with pool.lease("localhost", 5900, "secret") as second:
+                assert second is first
+                assert pool.stats()["localhost:5900"]["leases"] == 2
+            assert pool.stats()["localhost:5900"]["leases"] == 1
+            assert connections.closed == []
+        assert connections.opened == [first]
+        assert connections.closed == [first]
+        assert pool.stats() == {}
+
+    asyncio.run(main())
+
+
+def test_idle_connection_is_reused_then_closed_after_the_ttl(connections):
+    async def main():
+        pool = VNCConnectionPool(idle_ttl=0.05)
+        async with pool.lease("localhost", 5900, "secret") as first:
+            pass
+        async with pool.lease("localhost", 5900, "secret") as second:
+            assert second is first
+        assert connections.closed == []
+
+        await asyncio.sleep(0.1)
+        assert connections.closed == [first]
+        assert pool.stats() == {}
+
+    asyncio.run(main())
+
+
+def test_other_password_is_refused_while_leased_and_reconnects_when_idle(
+    connections,
+):
+    async def main():
+        pool = VNCConnectionPool(idle_ttl=10)
+        async with pool.lease("localhost", 5900, "secret") as first:
+            with pytest.raises(PermissionError):
+                async with pool.lease("localhost", 5900, "other"):
+                    pass
+            assert pool.stats()["localhost:5900"]["leases"] == 1
+
+        async with pool.lease("localhost", 5900, "other") as second:
+            assert second is not first
+            assert connections.closed == [first]
+        await pool.close_all()
+
+    asyncio.run(main())
+
+
+def test_other_capture_rate_is_refused_while_leased_and_reset_on_release(
+    connections,
+):
+    async def main():
+        pool = VNCConnectionPool(idle_ttl=10)
+        rate = AdaptiveCaptureRate()
+        async with pool.lease("localhost", 5900, "secret", rate) as manager:
+            assert manager.capture_rate is rate
+            # Leases without a rate share the paced connection
+            async with pool.lease("localhost", 5900, "secret"):
+                pass
+            with pytest.raises(ValueError):
+                async with pool.lease(
+                    "localhost", 5900, "secret", AdaptiveCaptureRate()
+                ):
+                    pass
+
+        assert manager.capture_rate is not rate
+        other_rate = AdaptiveCaptureRate()
+        async with pool.lease("localhost", 5900, "secret", other_rate) as again:
+            assert again is manager
+            assert manager.capture_rate is other_rate
+        await pool.close_all()
+        assert connections.closed == [manager]
+
+    asyncio.run(main())